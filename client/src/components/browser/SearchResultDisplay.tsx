@@ -10,7 +10,10 @@ import {
     FileSearchOutlined,
     FileAddOutlined,
 } from '@ant-design/icons';
-import { highlightSearchTerms } from '../../utils/highlighSearchTerms';
+import {
+    highlightSearchTerms,
+    highlightSpans,
+} from '../../utils/highlighSearchTerms';
 import { BigIcon, NullText, PDFLink } from '../shared/design-system.styled';
 import { getAllFilenames } from '../../API/repository/file-repository';
 
@@ -144,10 +147,15 @@ const SearchResultDisplay = ({ query, searchResult, loading }: Props) => {
                                 <DistanceSpan>{`dist ${result.distance}`}</DistanceSpan>
                             </ResultTitle>
                             <SnippetContainer>
-                                {highlightSearchTerms(
-                                    snippetToShow,
-                                    query.trim(),
-                                )}
+                                {result.highlights
+                                    ? highlightSpans(
+                                          snippetToShow,
+                                          result.highlights,
+                                      )
+                                    : highlightSearchTerms(
+                                          snippetToShow,
+                                          query.trim(),
+                                      )}
                                 {!showFullSnippet &&
                                     result.snippet.length > snippetLimit &&
                                     ' ... '}
@@ -3,4 +3,6 @@ export type ResultItem = {
     document: string;
     snippet: string;
     occurrences: number;
+    term_counts?: Record<string, number>;
+    highlights?: [number, number][];
 };
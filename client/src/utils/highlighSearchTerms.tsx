@@ -1,3 +1,4 @@
+import { ReactNode } from 'react';
 import styled from 'styled-components';
 
 export const highlightSearchTerms = (text: string, searchQuery: string) => {
@@ -28,6 +29,31 @@ export const highlightSearchTerms = (text: string, searchQuery: string) => {
     );
 };
 
+export const highlightSpans = (
+    text: string,
+    spans: [number, number][],
+) => {
+    const parts: ReactNode[] = [];
+    let position = 0;
+
+    spans.forEach(([start, spanEnd], index) => {
+        // Clip spans crossing the end of a truncated snippet
+        const end = Math.min(spanEnd, text.length);
+        // Skip spans overlapping the previous one or past the end
+        if (start < position || start >= end) {
+            return;
+        }
+        parts.push(text.substring(position, start));
+        parts.push(
+            <Highlight key={index}>{text.substring(start, end)}</Highlight>,
+        );
+        position = end;
+    });
+    parts.push(text.substring(position));
+
+    return <>{parts}</>;
+};
+
 function escapeRegExp(text: string) {
     return text.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
 }
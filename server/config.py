@@ -6,8 +6,10 @@ INDEX_PATH = NODE_PATH + '/index'
 MODEL_PATH = INDEX_PATH + '/doc2vec_model.pkl'
 FAISS_INDEX_PATH = INDEX_PATH + '/faiss_index.idx'
 FILENAMES_PATH = INDEX_PATH + '/filenames.pkl'
+SIGNATURES_PATH = INDEX_PATH + '/signatures.pkl'
 TEXT_PATH = NODE_PATH + '/extracted_texts'
 FILES_PATH = NODE_PATH + '/files'
+COLLECTIONS_PATH = NODE_PATH + '/collections'
 
 TEST_NODE_PATH = 'tests/test-node'
 TEST_INDEX_PATH = TEST_NODE_PATH + '/index'
@@ -15,8 +17,10 @@ TEST_INDEX_PATH = TEST_NODE_PATH + '/index'
 TEST_MODEL_PATH = TEST_INDEX_PATH + '/doc2vec_model.pkl'
 TEST_FAISS_INDEX_PATH = TEST_INDEX_PATH + '/faiss_index.idx'
 TEST_FILENAMES_PATH = TEST_INDEX_PATH + '/filenames.pkl'
+TEST_SIGNATURES_PATH = TEST_INDEX_PATH + '/signatures.pkl'
 TEST_TEXT_PATH = TEST_NODE_PATH + '/extracted_texts'
 TEST_FILES_PATH = TEST_NODE_PATH + '/files'
+TEST_COLLECTIONS_PATH = TEST_NODE_PATH + '/collections'
 
 
 
@@ -33,3 +37,37 @@ ORIGINS = [
     "http://51.210.255.189:3000/*",
     "http://51.210.255.189",
 ]
+
+# Startup and warm-up
+FAISS_MMAP = True
+WARMUP_QUERY = "warm up"
+
+# Query encoding: "full", "reduced", "average" or "auto". Check the top-n
+# overlap of a cheaper strategy with `python -m src.query_encoder` first
+QUERY_ENCODER_STRATEGY = "full"
+QUERY_INFER_EPOCHS = 10
+QUERY_AVERAGE_MAX_WORDS = 3
+QUERY_CACHE_SIZE = 1024
+
+# Threads building snippets for streamed searches
+SNIPPET_WORKERS = 4
+
+# Total size of the collection indexes kept in memory
+COLLECTIONS_MEMORY_BUDGET_MB = 1024
+
+# PDF extraction layout preset: "fast", "default" or "accurate"
+LAPARAMS_PRESET = "default"
+
+# Near-duplicate documents at ingest: "skip", "link" or "collapse"
+NEAR_DUPLICATE_POLICY = "collapse"
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+# Admission control: threads running search and ingest work, and for each
+# queue its priority (lower runs first), concurrent and waiting requests.
+# Search runs on all but one worker, so uploads still run under search load
+ADMISSION_WORKERS = 4
+ADMISSION_QUEUES = {
+    "search": {"priority": 0, "max_running": 3, "max_queue": 32},
+    "ingest": {"priority": 1, "max_running": 1, "max_queue": 4},
+}
+ADMISSION_RETRY_AFTER_SECONDS = 1
@@ -0,0 +1,155 @@
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class QueueFull(Exception):
+    """
+    Raised when a request is rejected because its queue is full.
+
+    Args:
+    queue (str): The name of the full queue.
+    retry_after (int): Seconds the client should wait before retrying.
+    """
+
+    def __init__(self, queue, retry_after):
+        super().__init__(f"The {queue} queue is full, retry in {retry_after}s")
+        self.queue = queue
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Runs CPU-bound work on a sized thread pool, off the event loop. Each kind
+    of work has its own bounded queue: once it is full, new requests are
+    rejected straight away instead of piling up. When a worker frees up, it
+    goes to the waiting request with the best (lowest) priority. No queue 
+    may run on every worker, so a backlog of high-priority work never 
+    starves the others: each other queue always has a worker held back.
+
+    Threads rather than processes are used because the model and index are
+    shared with the request handlers, and gensim, FAISS and numpy release
+    the GIL in their heavy loops.
+
+    Args:
+    workers (int): Number of threads running admitted work.
+    queues (dict): For each queue name, its "priority", its "max_running"
+    requests and its "max_queue" waiting requests.
+    retry_after (int, optional): Seconds suggested to rejected clients.
+    Defaults to 1.
+
+    Exceptions:
+    Raises ValueError if a queue's max_running leaves fewer workers than 
+    there are other queues.
+    """
+
+    def __init__(self, workers, queues, retry_after=1):
+        for name, settings in queues.items():
+            available = workers - (len(queues) - 1)
+            if not 1 <= settings["max_running"] <= available:
+                raise ValueError(
+                    f"The {name} queue may run between 1 and {available} requests "
+                    f"so that every other queue keeps a worker")
+        self.workers = workers
+        self.queues = queues
+        self.retry_after = retry_after
+        self._executor = None
+        self._waiters = []
+        self._running = {name: 0 for name in queues}
+        self._sequence = itertools.count()
+
+    async def run(self, queue, fn, *args, **kwargs):
+        """
+        Queues a function call and runs it on the pool once admitted.
+
+        Args:
+        queue (str): The name of the queue.
+        fn (callable): The function to run.
+        *args: Its positional arguments.
+        **kwargs: Its keyword arguments.
+
+        Returns:
+        The function's return value.
+
+        Exceptions:
+        Raises QueueFull if the queue already holds max_queue waiting requests.
+        """
+        settings = self.queues[queue]
+        if self.waiting(queue) >= settings["max_queue"]:
+            raise QueueFull(queue, self.retry_after)
+
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+        entry = (settings["priority"], next(self._sequence), queue, admitted)
+        self._waiters.append(entry)
+        self._dispatch()
+
+        try:
+            await admitted
+        except asyncio.CancelledError:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+            elif admitted.done() and not admitted.cancelled():
+                self._release(queue)
+            raise
+
+        try:
+            return await loop.run_in_executor(self._get_executor(), partial(fn, *args, **kwargs))
+        finally:
+            self._release(queue)
+
+    def waiting(self, queue):
+        """
+        Counts the requests waiting in a queue.
+
+        Args:
+        queue (str): The name of the queue.
+
+        Returns:
+        int: The number of waiting requests.
+        """
+        return sum(1 for entry in self._waiters if entry[2] == queue)
+
+    def stats(self):
+        """
+        Reports how many requests each queue is running and holding.
+
+        Returns:
+        dict: The running and waiting requests of each queue.
+        """
+        return {name: {"running": self._running[name], "waiting": self.waiting(name)}
+                for name in self.queues}
+
+    def close(self):
+        """
+        Shuts down the worker threads.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _dispatch(self):
+        # Hand free workers to the waiting requests, best priority first
+        for entry in sorted(self._waiters, key=lambda entry: entry[:2]):
+            if sum(self._running.values()) >= self.workers:
+                break
+            _, _, queue, admitted = entry
+            if admitted.done():
+                self._waiters.remove(entry)
+                continue
+            if self._running[queue] >= self.queues[queue]["max_running"]:
+                continue
+            self._waiters.remove(entry)
+            self._running[queue] += 1
+            admitted.set_result(None)
+
+    def _release(self, queue):
+        self._running[queue] -= 1
+        self._dispatch()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix="admission")
+        return self._executor
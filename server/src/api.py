@@ -1,28 +1,160 @@
+import time
+# Time the imports, reported by /readyz. gensim, FAISS and pdfminer are
+# imported inside the functions that use them, so that they load with the
+# index or the first upload rather than before the server starts.
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+import asyncio
+import json
+from functools import partial
 import shutil
 from typing import List
 import os
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.files import upload_and_process_pdf, upload_and_process_pdfs
-from src.search import load_model_index_and_filenames, search
+from src.admission import AdmissionController, QueueFull
+from src.collection_manager import CollectionManager, collection_paths
+from src.engine import SearchEngine
+from src.files import process_pdfs
+from src.query_encoder import QueryEncoder
 
 import config
 
 class SearchRequest(BaseModel):
     query: str
 
-app = FastAPI()
-
 # Define paths to various directories and files from configuration
 index_path = config.INDEX_PATH
 model_path = config.MODEL_PATH
 faiss_index_path = config.FAISS_INDEX_PATH
 filenames_path = config.FILENAMES_PATH
+signatures_path = config.SIGNATURES_PATH
 text_path = config.TEXT_PATH
 files_path = config.FILES_PATH
 
+def make_engine(paths):
+    """
+    Builds a search engine for the model, index and texts at the given paths.
+
+    Args:
+    paths (dict): The model, FAISS index, filenames, signatures and text paths.
+
+    Returns:
+    SearchEngine: The search engine.
+    """
+    return SearchEngine(
+        paths["model_path"],
+        paths["faiss_index_path"],
+        paths["filenames_path"],
+        paths["text_path"],
+        mmap=config.FAISS_MMAP,
+        warmup_query=config.WARMUP_QUERY,
+        encoder=QueryEncoder(
+            config.QUERY_ENCODER_STRATEGY,
+            epochs=config.QUERY_INFER_EPOCHS,
+            max_average_words=config.QUERY_AVERAGE_MAX_WORDS,
+            cache_size=config.QUERY_CACHE_SIZE
+        ),
+        snippet_workers=config.SNIPPET_WORKERS,
+        signatures_path=paths.get("signatures_path")
+    )
+
+default_paths = {
+    "model_path": model_path,
+    "faiss_index_path": faiss_index_path,
+    "filenames_path": filenames_path,
+    "signatures_path": signatures_path,
+    "text_path": text_path,
+    "files_path": files_path,
+}
+
+# Keep the loaded model and index resident between requests
+engine = make_engine(default_paths)
+
+# Named collections share the process within a memory budget
+collections = CollectionManager(
+    config.COLLECTIONS_PATH,
+    make_engine,
+    config.COLLECTIONS_MEMORY_BUDGET_MB * 1024 * 1024
+)
+
+# Run search and ingest work off the event loop, with bounded queues
+admission = AdmissionController(
+    config.ADMISSION_WORKERS,
+    config.ADMISSION_QUEUES,
+    retry_after=config.ADMISSION_RETRY_AFTER_SECONDS
+)
+
+def ingest_pdfs(files, paths, reload):
+    """
+    Saves uploaded PDF files, rebuilds the index at the given paths, and 
+    reloads it. The directories are created here, once the upload has been 
+    admitted, so that a rejected upload leaves no empty collection behind.
+
+    Args:
+    files (List[UploadFile]): The PDF files to be uploaded.
+    paths (dict): The files, text, model, FAISS index, filenames and 
+    signatures paths.
+    reload (callable): Reloads the rebuilt index.
+    """
+    os.makedirs(os.path.dirname(paths["model_path"]), exist_ok=True)
+    process_pdfs(
+        files,
+        upload_directory=paths["files_path"],
+        text_directory=paths["text_path"],
+        model_path=paths["model_path"],
+        faiss_index_path=paths["faiss_index_path"],
+        filenames_path=paths["filenames_path"],
+        laparams_preset=config.LAPARAMS_PRESET,
+        signatures_path=paths["signatures_path"],
+        duplicate_policy=config.NEAR_DUPLICATE_POLICY,
+        duplicate_threshold=config.NEAR_DUPLICATE_THRESHOLD
+    )
+    reload()
+
+async def warm_up_engine():
+    """
+    Loads and warms up the search engine off the event loop, so that 
+    /healthz answers while the index is still being loaded.
+    """
+    try:
+        metrics = await run_in_threadpool(engine.start)
+        print(f"Search engine ready: {metrics}")
+    except Exception as e:
+        print(f"An error occurred while warming up the search engine: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the search engine warm-up when the application starts.
+    """
+    app.state.warmup_task = asyncio.create_task(warm_up_engine())
+    yield
+    await app.state.warmup_task
+    engine.close()
+    collections.close()
+    admission.close()
+
+app = FastAPI(lifespan=lifespan)
+
+import_seconds = time.perf_counter() - _import_started
+
+@app.exception_handler(QueueFull)
+async def queue_full_handler(request, exc: QueueFull):
+    """
+    Rejects requests whose queue is full with a 503 and a Retry-After header.
+    """
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Configure CORS policy
 app.add_middleware(
     CORSMiddleware,
@@ -43,14 +175,7 @@ async def upload_pdfs(files: List[UploadFile] = File(...)):
     Returns:
     dict: A dictionary containing the filenames of the uploaded files.
     """
-    await upload_and_process_pdfs(
-        files,
-        upload_directory=files_path,
-        text_directory=text_path,
-        model_path=model_path,
-        faiss_index_path=faiss_index_path,
-        filenames_path=filenames_path
-    )
+    await admission.run("ingest", ingest_pdfs, files, default_paths, engine.load)
     return {"filenames": [file.filename for file in files]}
 
 @app.post("/upload-pdf")
@@ -65,14 +190,7 @@ async def upload_pdf(file: UploadFile = File(...)):
     dict: A dictionary containing the filename of the uploaded file.
     """
     # Process the uploaded PDF file
-    await upload_and_process_pdf(
-        file, 
-        upload_directory=files_path,
-        text_directory=text_path,
-        model_path=model_path,
-        faiss_index_path=faiss_index_path,
-        filenames_path=filenames_path
-    )
+    await admission.run("ingest", ingest_pdfs, [file], default_paths, engine.load)
     return {"filename": file.filename}
 
 @app.post("/search", response_model=List[dict])
@@ -87,29 +205,202 @@ async def perform_search(request: SearchRequest):
     list: A list of dictionaries containing search results.
     """
     try:
-        # Load model, FAISS index, and filenames
-        model, faiss_index, filenames = load_model_index_and_filenames(
-            model_path, faiss_index_path, filenames_path)
-
-        # Perform the search operation
-        search_results = search(request.query, model, faiss_index, 
-                                filenames, text_path)
+        # Perform the search operation against the resident index
+        search_results = await admission.run("search", engine.search, request.query)
 
         # Format and return the search results
         response = []
-        for filename, distance, snippet, occurrences in search_results:
+        for filename, distance, snippet, occurrences, term_counts, highlights in search_results:
             result = {
                 "document": filename,
                 "distance": float(distance),
                 "occurrences": occurrences,
-                "snippet": snippet
+                "term_counts": term_counts,
+                "snippet": snippet,
+                "highlights": highlights,
+                "duplicates": engine.duplicates.get(filename, [])
             }
             response.append(result)
 
         return response
+    except QueueFull:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/search/stream")
+async def perform_search_stream(request: SearchRequest):
+    """
+    Endpoint to search the indexed documents, streaming the results as 
+    newline-delimited JSON.
+
+    The ranked hits (document and distance) are sent as soon as FAISS 
+    returns them, followed by each snippet and occurrence count as it is 
+    built, and a final line with the time to first result.
+
+    Args:
+    request (SearchRequest): The search query.
+
+    Returns:
+    StreamingResponse: An application/x-ndjson stream of search events.
+    """
+    started = time.perf_counter()
+    try:
+        # Rank off the event loop, before the response starts
+        hits = await admission.run("search", engine.rank, request.query)
+    except QueueFull:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def ndjson():
+        async for event in engine.stream(request.query, hits, started):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+def get_collection(name):
+    """
+    Returns the engine of an existing collection.
+
+    Args:
+    name (str): The name of the collection.
+
+    Returns:
+    SearchEngine: The collection's engine.
+
+    Exceptions:
+    Raises a 404 HTTPException if the collection does not exist or has no 
+    index yet.
+    """
+    try:
+        exists = collections.exists(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    collection = collections.get(name) if exists else None
+    if collection is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    return collection
+
+def search_collection(name, query):
+    """
+    Searches a collection, loading it first if needed.
+
+    Args:
+    name (str): The name of the collection.
+    query (str): The search query.
+
+    Returns:
+    tuple: The collection's engine and its search results.
+    """
+    collection = get_collection(name)
+    return collection, collection.search(query)
+
+def rank_collection(name, query):
+    """
+    Ranks the documents of a collection, loading it first if needed.
+
+    Args:
+    name (str): The name of the collection.
+    query (str): The search query.
+
+    Returns:
+    tuple: The collection's engine and its (filename, distance) hits.
+    """
+    collection = get_collection(name)
+    return collection, collection.rank(query)
+
+@app.get("/collections")
+async def list_collections():
+    """
+    Endpoint to list the collections and the ones resident in memory.
+
+    Returns:
+    dict: The collection names and the index size of resident collections.
+    """
+    return {"collections": collections.names(), "resident": collections.resident()}
+
+@app.post("/collections/{name}/upload")
+async def upload_collection_pdfs(name: str, files: List[UploadFile] = File(...)):
+    """
+    Endpoint to upload PDF files to a collection, creating it if needed.
+
+    Args:
+    name (str): The name of the collection.
+    files (List[UploadFile]): The list of PDF files to be uploaded.
+
+    Returns:
+    dict: A dictionary containing the filenames of the uploaded files.
+    """
+    try:
+        paths = collection_paths(config.COLLECTIONS_PATH, name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await admission.run("ingest", ingest_pdfs, files, paths,
+                        partial(collections.reload, name))
+    return {"filenames": [file.filename for file in files]}
+
+@app.post("/collections/{name}/search", response_model=List[dict])
+async def perform_collection_search(name: str, request: SearchRequest):
+    """
+    Endpoint to search the documents of a collection.
+
+    Args:
+    name (str): The name of the collection.
+    request (SearchRequest): The search query.
+
+    Returns:
+    list: A list of dictionaries containing search results.
+    """
+    try:
+        collection, search_results = await admission.run(
+            "search", search_collection, name, request.query)
+        return [
+            {
+                "document": filename,
+                "distance": float(distance),
+                "occurrences": occurrences,
+                "term_counts": term_counts,
+                "snippet": snippet,
+                "highlights": highlights,
+                "duplicates": collection.duplicates.get(filename, [])
+            }
+            for filename, distance, snippet, occurrences, term_counts, highlights in search_results
+        ]
+    except (QueueFull, HTTPException):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/collections/{name}/search/stream")
+async def perform_collection_search_stream(name: str, request: SearchRequest):
+    """
+    Endpoint to search the documents of a collection, streaming the results 
+    as newline-delimited JSON like /search/stream.
+
+    Args:
+    name (str): The name of the collection.
+    request (SearchRequest): The search query.
+
+    Returns:
+    StreamingResponse: An application/x-ndjson stream of search events.
+    """
+    started = time.perf_counter()
+    try:
+        collection, hits = await admission.run(
+            "search", rank_collection, name, request.query)
+    except (QueueFull, HTTPException):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def ndjson():
+        async for event in collection.stream(request.query, hits, started):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @app.get("/get-pdf/{filename}")
 async def get_pdf(filename: str):
     """
@@ -161,6 +452,7 @@ async def reset_data():
     """
     try:
         # Clear directories and reset data
+        engine.clear()
         if os.path.exists(text_path):
             shutil.rmtree(text_path)
             os.makedirs(text_path)  
@@ -175,6 +467,36 @@ async def reset_data():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness probe: the process is up and serving requests.
+
+    Returns:
+    dict: A dictionary with the status of the process.
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness probe: the index is loaded and warmed up.
+
+    Returns:
+    JSONResponse: The startup metrics, with status 200 once the engine 
+    is ready and 503 before. A failed warm-up still reports ready, flagged 
+    as degraded with the error in startup_error.
+    """
+    content = {
+        "ready": engine.ready,
+        "degraded": engine.degraded,
+        "index_loaded": engine.model is not None,
+        "import_seconds": import_seconds,
+        **engine.metrics,
+        "queues": admission.stats()
+    }
+    return JSONResponse(content=content, status_code=200 if engine.ready else 503)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
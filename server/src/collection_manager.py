@@ -0,0 +1,210 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def collection_paths(collections_directory, name):
+    """
+    Builds the paths of a named collection, laid out like the default node.
+
+    Args:
+    collections_directory (str): The directory holding every collection.
+    name (str): The name of the collection.
+
+    Returns:
+    dict: The index, model, FAISS index, filenames, signatures, text and 
+    files paths.
+
+    Exceptions:
+    Raises ValueError if the name is not made of letters, digits, '_' and '-'.
+    """
+    if not COLLECTION_NAME_PATTERN.match(name):
+        raise ValueError(f"Invalid collection name: {name}")
+    node_path = os.path.join(collections_directory, name)
+    index_path = os.path.join(node_path, 'index')
+    return {
+        "node_path": node_path,
+        "index_path": index_path,
+        "model_path": os.path.join(index_path, 'doc2vec_model.pkl'),
+        "faiss_index_path": os.path.join(index_path, 'faiss_index.idx'),
+        "filenames_path": os.path.join(index_path, 'filenames.pkl'),
+        "signatures_path": os.path.join(index_path, 'signatures.pkl'),
+        "text_path": os.path.join(node_path, 'extracted_texts'),
+        "files_path": os.path.join(node_path, 'files'),
+    }
+
+
+class CollectionManager:
+    """
+    Serves several named collections from one process, each with its own
+    model, FAISS index and text store. Collections are loaded on first use
+    and the least recently used ones are evicted once the resident indexes
+    exceed the memory budget.
+
+    Indexes are loaded outside the manager's lock, so that loading a large 
+    collection does not block requests to the resident ones. Concurrent 
+    requests for the same collection wait for a single load.
+
+    Args:
+    collections_directory (str): The directory holding every collection.
+    engine_factory (callable): Builds a SearchEngine from a collection's paths.
+    memory_budget_bytes (int): Total size of the indexes kept resident.
+    """
+
+    def __init__(self, collections_directory, engine_factory, memory_budget_bytes):
+        self.collections_directory = collections_directory
+        self.engine_factory = engine_factory
+        self.memory_budget_bytes = memory_budget_bytes
+        self._engines = OrderedDict()
+        self._sizes = {}
+        self._loading = {}
+        self._lock = threading.RLock()
+
+    def names(self):
+        """
+        Lists the collections stored on disk.
+
+        Returns:
+        list: The sorted collection names.
+        """
+        if not os.path.exists(self.collections_directory):
+            return []
+        return sorted(name for name in os.listdir(self.collections_directory)
+                      if os.path.isdir(os.path.join(self.collections_directory, name)))
+
+    def exists(self, name):
+        """
+        Checks whether a collection has been created.
+
+        Args:
+        name (str): The name of the collection.
+
+        Returns:
+        bool: True if the collection directory exists.
+        """
+        return os.path.isdir(collection_paths(self.collections_directory, name)["node_path"])
+
+    def get(self, name):
+        """
+        Returns the engine of a collection, loading its index if it is not
+        resident and evicting idle collections to stay within budget.
+
+        Args:
+        name (str): The name of the collection.
+
+        Returns:
+        SearchEngine: The collection's engine, or None if the collection 
+        has no index yet.
+        """
+        with self._lock:
+            if name in self._engines:
+                self._engines.move_to_end(name)
+                return self._engines[name]
+
+        with self._loading_lock(name):
+            with self._lock:
+                # Another request loaded it while this one waited
+                if name in self._engines:
+                    self._engines.move_to_end(name)
+                    return self._engines[name]
+
+            engine = self.engine_factory(collection_paths(self.collections_directory, name))
+            if not engine.index_exists():
+                return None
+            size = index_size(engine)
+            with self._lock:
+                self._evict(self.memory_budget_bytes - size)
+            engine.load()
+
+            with self._lock:
+                # Collections loaded concurrently may have used up the budget
+                self._evict(self.memory_budget_bytes - size)
+                self._engines[name] = engine
+                self._sizes[name] = size
+            return engine
+
+    def reload(self, name):
+        """
+        Reloads a collection after its index has been rebuilt.
+
+        Args:
+        name (str): The name of the collection.
+
+        Returns:
+        SearchEngine: The collection's engine, or None if the collection 
+        has no index.
+        """
+        # Wait for any load of the previous index before dropping it
+        with self._loading_lock(name):
+            self.evict(name)
+        return self.get(name)
+
+    def evict(self, name):
+        """
+        Drops a collection's index from memory. It is loaded again on the
+        next request.
+
+        Only the manager's reference is dropped: requests still holding the
+        engine finish on the index they started with, and its memory and 
+        snippet pool are released with the last of them. Clearing the 
+        engine instead would make them load it again behind the manager's 
+        back, outside the memory budget.
+
+        Args:
+        name (str): The name of the collection.
+
+        Returns:
+        SearchEngine: The evicted engine, or None if it was not resident.
+        """
+        with self._lock:
+            self._sizes.pop(name, None)
+            return self._engines.pop(name, None)
+
+    def resident(self):
+        """
+        Lists the resident collections and their index sizes.
+
+        Returns:
+        dict: Index size in bytes by collection name, least recently used first.
+        """
+        with self._lock:
+            return {name: self._sizes[name] for name in self._engines}
+
+    def close(self):
+        """
+        Evicts every collection and shuts down their snippet pools.
+        """
+        with self._lock:
+            engines = [self.evict(name) for name in list(self._engines)]
+        for engine in engines:
+            engine.close()
+
+    def _loading_lock(self, name):
+        # One lock per collection, held while its index loads
+        with self._lock:
+            return self._loading.setdefault(name, threading.Lock())
+
+    def _evict(self, available_bytes):
+        # Evict least recently used collections until the rest fits
+        while self._engines and sum(self._sizes.values()) > available_bytes:
+            name = next(iter(self._engines))
+            print(f"Evicting collection {name} to stay within the memory budget")
+            self.evict(name)
+
+
+def index_size(engine):
+    """
+    Estimates the memory an engine's index takes once loaded from the size
+    of its model and FAISS index files.
+
+    Args:
+    engine (SearchEngine): The engine.
+
+    Returns:
+    int: The estimated size in bytes.
+    """
+    return sum(os.path.getsize(path) for path in (engine.model_path, engine.faiss_index_path)
+               if os.path.exists(path))
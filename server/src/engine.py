@@ -0,0 +1,267 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.near_duplicates import linked_duplicates, load_signature_store, reported_duplicates
+from src.search import build_snippet, load_model_index_and_filenames, rank, search
+
+
+class SearchEngine:
+    """
+    Keeps the model, FAISS index, and filenames resident between requests
+    and tracks whether the engine is warm enough to serve traffic.
+
+    Args:
+    model_path (str): Path to the saved model.
+    faiss_index_path (str): Path to the saved FAISS index.
+    filenames_path (str): Path to the saved filenames.
+    text_directory (str): Directory where the text files are stored.
+    mmap (bool, optional): Memory-map the FAISS index. Defaults to False.
+    warmup_query (str, optional): Query run once the index is loaded.
+    encoder (QueryEncoder, optional): Encodes queries. Defaults to full 
+    inference with model.infer_vector.
+    snippet_workers (int, optional): Size of the thread pool building 
+    snippets for streamed searches. Defaults to 4.
+    signatures_path (str, optional): Path to the saved near-duplicate 
+    signatures. Near duplicates linked into the index are collapsed in 
+    results when given.
+    """
+
+    def __init__(self, model_path, faiss_index_path, filenames_path,
+                 text_directory, mmap=False, warmup_query="warm up", encoder=None,
+                 snippet_workers=4, signatures_path=None):
+        self.model_path = model_path
+        self.faiss_index_path = faiss_index_path
+        self.filenames_path = filenames_path
+        self.text_directory = text_directory
+        self.mmap = mmap
+        self.warmup_query = warmup_query
+        self.encoder = encoder
+        self.snippet_workers = snippet_workers
+        self.signatures_path = signatures_path
+        self._snippet_pool = None
+
+        self.model = None
+        self.faiss_index = None
+        self.filenames = None
+        self.duplicate_of = {}
+        self.duplicates = {}
+        self.ready = False
+        self.metrics = {
+            "load_seconds": None,
+            "warmup_seconds": None,
+            "startup_seconds": None,
+            "first_query_seconds": None,
+            "time_to_first_result_seconds": None,
+            "startup_error": None,
+        }
+        self._lock = threading.Lock()
+
+    def index_exists(self):
+        """
+        Checks whether a model, FAISS index, and filenames have been saved.
+
+        Returns:
+        bool: True if every index file exists on disk.
+        """
+        return all(os.path.exists(path) for path in
+                   (self.model_path, self.faiss_index_path, self.filenames_path))
+
+    def load(self):
+        """
+        Loads the current model, FAISS index, and filenames from disk,
+        replacing any previously loaded ones.
+
+        Returns:
+        tuple: A tuple containing the loaded model, FAISS index, and list of filenames.
+        """
+        started = time.perf_counter()
+        model, faiss_index, filenames = load_model_index_and_filenames(
+            self.model_path, self.faiss_index_path, self.filenames_path,
+            mmap=self.mmap)
+        store = load_signature_store(self.signatures_path)
+        with self._lock:
+            self.model = model
+            self.faiss_index = faiss_index
+            self.filenames = filenames
+            self.duplicate_of = linked_duplicates(store)
+            self.duplicates = reported_duplicates(store)
+        if self.encoder is not None:
+            self.encoder.clear()
+        self.metrics["load_seconds"] = time.perf_counter() - started
+        # A successful reload, e.g. after an ingest repaired the node,
+        # makes the engine ready again
+        self.metrics["startup_error"] = None
+        self.ready = True
+        return model, faiss_index, filenames
+
+    def get(self):
+        """
+        Returns the loaded model, FAISS index, and filenames, loading them
+        from disk if needed.
+
+        Returns:
+        tuple: A tuple containing the model, FAISS index, and list of filenames.
+        """
+        with self._lock:
+            if self.model is not None:
+                return self.model, self.faiss_index, self.filenames
+        return self.load()
+
+    def clear(self):
+        """
+        Drops the loaded model, FAISS index, and filenames.
+        """
+        with self._lock:
+            self.model = None
+            self.faiss_index = None
+            self.filenames = None
+            self.duplicate_of = {}
+            self.duplicates = {}
+        if self.encoder is not None:
+            self.encoder.clear()
+
+    def warm_up(self):
+        """
+        Runs a throwaway query so the first real request does not pay for
+        lazy imports, page faults, and allocator warm-up.
+        """
+        started = time.perf_counter()
+        model, faiss_index, filenames = self.get()
+        search(self.warmup_query, model, faiss_index, filenames,
+               self.text_directory, encoder=self.encoder,
+               duplicate_of=self.duplicate_of)
+        self.metrics["warmup_seconds"] = time.perf_counter() - started
+
+    @property
+    def degraded(self):
+        """
+        bool: True if the startup load or warm-up failed and no reload has 
+        succeeded since.
+        """
+        return self.metrics["startup_error"] is not None
+
+    def start(self):
+        """
+        Loads and warms up the current index, if there is one, then marks
+        the engine ready. An empty node is ready straight away.
+
+        A broken index does not keep the engine unready: the error is 
+        recorded in the metrics and the engine is marked ready but degraded, 
+        so that traffic, including the uploads that repair the node, still 
+        reaches it.
+
+        Returns:
+        dict: The startup metrics.
+        """
+        started = time.perf_counter()
+        try:
+            if self.index_exists():
+                self.load()
+                self.warm_up()
+        except Exception as e:
+            self.metrics["startup_error"] = f"{type(e).__name__}: {e}"
+        self.metrics["startup_seconds"] = time.perf_counter() - started
+        self.ready = True
+        return self.metrics
+
+    def search(self, query):
+        """
+        Performs a search against the loaded index.
+
+        Args:
+        query (str): The search query.
+
+        Returns:
+        list: A list of search results with filename, distance, snippet, 
+        occurrences, occurrences of each term, and highlight spans.
+        """
+        started = time.perf_counter()
+        model, faiss_index, filenames = self.get()
+        results = search(query, model, faiss_index, filenames,
+                         self.text_directory, encoder=self.encoder,
+                         duplicate_of=self.duplicate_of)
+        if self.metrics["first_query_seconds"] is None:
+            self.metrics["first_query_seconds"] = time.perf_counter() - started
+        return results
+
+    def rank(self, query):
+        """
+        Finds the documents closest to a query, without building snippets.
+
+        Args:
+        query (str): The search query.
+
+        Returns:
+        list: A list of (filename, distance) tuples, best match first.
+        """
+        model, faiss_index, filenames = self.get()
+        return rank(query, model, faiss_index, filenames, encoder=self.encoder,
+                    duplicate_of=self.duplicate_of)
+
+    async def stream(self, query, hits, started=None):
+        """
+        Yields the ranked hits straight away, then each snippet and 
+        occurrence count as soon as it is built on the snippet pool.
+
+        Args:
+        query (str): The search query.
+        hits (list): The (filename, distance) tuples returned by rank.
+        started (float, optional): time.perf_counter() when the request 
+        arrived. Defaults to now.
+
+        Yields:
+        dict: "hit" events in rank order, "snippet" (or "error") events in 
+        completion order, and a final "done" event with the timings.
+        """
+        if started is None:
+            started = time.perf_counter()
+        time_to_first_result = None
+
+        for position, (filename, distance) in enumerate(hits):
+            if time_to_first_result is None:
+                time_to_first_result = time.perf_counter() - started
+                self.metrics["time_to_first_result_seconds"] = time_to_first_result
+            yield {"type": "hit", "rank": position, "document": filename,
+                   "distance": float(distance),
+                   "duplicates": self.duplicates.get(filename, [])}
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_snippet_pool()
+
+        async def snippet_job(position, filename):
+            try:
+                snippet, occurrences, term_counts, highlights = await loop.run_in_executor(
+                    pool, build_snippet, query, filename, self.text_directory)
+            except Exception as e:
+                return {"type": "error", "rank": position, "document": filename,
+                        "detail": str(e)}
+            return {"type": "snippet", "rank": position, "document": filename,
+                    "occurrences": occurrences, "term_counts": term_counts,
+                    "snippet": snippet, "highlights": highlights}
+
+        jobs = [snippet_job(position, filename)
+                for position, (filename, _) in enumerate(hits)]
+        for finished in asyncio.as_completed(jobs):
+            yield await finished
+
+        yield {"type": "done",
+               "time_to_first_result_ms": 1000 * (time_to_first_result or 0.0),
+               "total_ms": 1000 * (time.perf_counter() - started)}
+
+    def close(self):
+        """
+        Shuts down the snippet thread pool.
+        """
+        if self._snippet_pool is not None:
+            self._snippet_pool.shutdown(wait=False)
+            self._snippet_pool = None
+
+    def _get_snippet_pool(self):
+        with self._lock:
+            if self._snippet_pool is None:
+                self._snippet_pool = ThreadPoolExecutor(
+                    max_workers=self.snippet_workers, thread_name_prefix="snippet")
+            return self._snippet_pool
@@ -1,21 +1,24 @@
 import os
 import pickle
 import shutil
-from fastapi import UploadFile
-import faiss
 
 from fastapi import UploadFile
 from typing import List
 
 
+from src.near_duplicates import excluded_documents, update_near_duplicates
 from src.pdf_text_extraction_script import process_pdf_directory
 from src.vectorization_faiss_index_script import load_documents, vectorize_documents, create_faiss_index
 
 
-async def upload_and_process_pdfs(files: List[UploadFile], upload_directory, text_directory,
-                                  model_path, faiss_index_path, filenames_path):
+def process_pdfs(files: List[UploadFile], upload_directory, text_directory,
+                 model_path, faiss_index_path, filenames_path,
+                 laparams_preset="default",
+                 signatures_path=None, duplicate_policy="collapse",
+                 duplicate_threshold=0.8):
     """
-    Uploads multiple PDF files, processes them, and updates the model and FAISS index.
+    Saves uploaded PDF files, extracts their text, and rebuilds the model and 
+    FAISS index. This is blocking, CPU-bound work: run it off the event loop.
 
     Args:
     files (List[UploadFile]): The list of PDF files to be uploaded and processed.
@@ -24,6 +27,14 @@ async def upload_and_process_pdfs(files: List[UploadFile], upload_directory, tex
     model_path (str): The path where the Doc2Vec model is saved.
     faiss_index_path (str): The path where the FAISS index is saved.
     filenames_path (str): The path where the filenames of processed documents are saved.
+    laparams_preset (str, optional): The pdfminer layout preset used for 
+    extraction. Defaults to "default".
+    signatures_path (str, optional): The path where the MinHash signatures are 
+    saved. Near-duplicate detection is off when None. Defaults to None.
+    duplicate_policy (str, optional): What to do with near duplicates: "skip", 
+    "link" or "collapse". Defaults to "collapse".
+    duplicate_threshold (float, optional): Estimated similarity above which 
+    documents are near duplicates. Defaults to 0.8.
     """
     # Ensure directories exist
     if not os.path.exists(upload_directory):
@@ -31,28 +42,70 @@ async def upload_and_process_pdfs(files: List[UploadFile], upload_directory, tex
     if not os.path.exists(text_directory):
         os.makedirs(text_directory)
 
-    # Process each file
+    # Save each file to the upload directory
     for file in files:
         file_path = os.path.join(upload_directory, file.filename)
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
 
-        process_pdf_directory(upload_directory, text_directory)
+    # Process the PDFs to extract text and save it in the text directory
+    process_pdf_directory(upload_directory, text_directory, laparams_preset)
+
+    # Find near duplicates and, unless they are linked, leave them out
+    exclude = None
+    if signatures_path is not None:
+        store = update_near_duplicates(text_directory, signatures_path,
+                                       duplicate_policy, duplicate_threshold)
+        exclude = excluded_documents(store)
 
     # Load, vectorize, and index all documents
-    documents = load_documents(text_directory)
+    documents = load_documents(text_directory, exclude=exclude)
     model, doc_vectors = vectorize_documents(documents)
     faiss_index = create_faiss_index(doc_vectors)
 
+    import faiss
+
     # Save the model, FAISS index, and filenames
     pickle.dump(model, open(model_path, "wb"))
     faiss.write_index(faiss_index, faiss_index_path)
-    original_filenames = [file.filename for file in files]
-    pickle.dump(original_filenames, open(filenames_path, "wb"))
-    
+    # Filenames follow the order of the vectors in the index
+    pickle.dump(list(documents), open(filenames_path, "wb"))
+
+
+async def upload_and_process_pdfs(files: List[UploadFile], upload_directory, text_directory,
+                                  model_path, faiss_index_path, filenames_path,
+                                  laparams_preset="default",
+                                  signatures_path=None, duplicate_policy="collapse",
+                                  duplicate_threshold=0.8):
+    """
+    Uploads multiple PDF files, processes them, and updates the model and FAISS index.
+
+    Args:
+    files (List[UploadFile]): The list of PDF files to be uploaded and processed.
+    upload_directory (str): The directory where the uploaded files are stored.
+    text_directory (str): The directory where text extracted from PDFs is stored.
+    model_path (str): The path where the Doc2Vec model is saved.
+    faiss_index_path (str): The path where the FAISS index is saved.
+    filenames_path (str): The path where the filenames of processed documents are saved.
+    laparams_preset (str, optional): The pdfminer layout preset used for 
+    extraction. Defaults to "default".
+    signatures_path (str, optional): The path where the MinHash signatures are 
+    saved. Near-duplicate detection is off when None. Defaults to None.
+    duplicate_policy (str, optional): What to do with near duplicates: "skip", 
+    "link" or "collapse". Defaults to "collapse".
+    duplicate_threshold (float, optional): Estimated similarity above which 
+    documents are near duplicates. Defaults to 0.8.
+    """
+    process_pdfs(files, upload_directory, text_directory, model_path, faiss_index_path,
+                 filenames_path, laparams_preset, signatures_path, duplicate_policy,
+                 duplicate_threshold)
+
 
 async def upload_and_process_pdf(file: UploadFile, upload_directory, text_directory,
-                                 model_path, faiss_index_path, filenames_path):
+                                 model_path, faiss_index_path, filenames_path,
+                                 laparams_preset="default",
+                                 signatures_path=None, duplicate_policy="collapse",
+                                 duplicate_threshold=0.8):
     """
     Uploads a PDF file, processes it, and updates the model and FAISS index.
 
@@ -63,29 +116,19 @@ async def upload_and_process_pdf(file: UploadFile, upload_directory, text_direct
     model_path (str): The path where the Doc2Vec model is saved.
     faiss_index_path (str): The path where the FAISS index is saved.
     filenames_path (str): The path where the filenames of processed documents are saved.
+    laparams_preset (str, optional): The pdfminer layout preset used for 
+    extraction. Defaults to "default".
+    signatures_path (str, optional): The path where the MinHash signatures are 
+    saved. Near-duplicate detection is off when None. Defaults to None.
+    duplicate_policy (str, optional): What to do with near duplicates: "skip", 
+    "link" or "collapse". Defaults to "collapse".
+    duplicate_threshold (float, optional): Estimated similarity above which 
+    documents are near duplicates. Defaults to 0.8.
 
     Description:
     This function handles the uploading of a PDF file, extracts text from it, 
     vectorizes the text, updates the model and the FAISS index, and saves these updates.
     """
-    # Create the upload directory if it doesn't exist
-    if not os.path.exists(upload_directory):
-        os.makedirs(upload_directory)
-
-    # Save the uploaded file to the upload directory
-    file_path = os.path.join(upload_directory, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # Process the PDF to extract text and save it in the text directory
-    original_filenames = process_pdf_directory(upload_directory, text_directory)
-
-    # Load documents, vectorize them, and create a FAISS index
-    documents = load_documents(text_directory)
-    model, doc_vectors = vectorize_documents(documents)
-    faiss_index = create_faiss_index(doc_vectors)
-
-    # Save the model, FAISS index, and filenames
-    pickle.dump(model, open(model_path, "wb"))
-    faiss.write_index(faiss_index, faiss_index_path)
-    pickle.dump(original_filenames, open(filenames_path, "wb"))
+    process_pdfs([file], upload_directory, text_directory, model_path, faiss_index_path,
+                 filenames_path, laparams_preset, signatures_path, duplicate_policy,
+                 duplicate_threshold)
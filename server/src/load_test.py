@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import numpy as np
+
+DEFAULT_QUERIES = ["machine learning", "research", '"applied research"', "data"]
+
+
+def summarize(samples, duration):
+    """
+    Summarizes the requests of one kind sent during a load test.
+
+    Args:
+    samples (list): The (status_code, latency_seconds) of each request. The
+    status code is None when the request failed without a response.
+    duration (float): The length of the test in seconds.
+
+    Returns:
+    dict: The request, success, rejection (503) and error counts, the
+    throughput of successful requests, and the latency percentiles in
+    milliseconds.
+    """
+    latencies = np.array([latency for _, latency in samples]) * 1000
+    ok = sum(1 for status, _ in samples if status is not None and status < 400)
+    rejected = sum(1 for status, _ in samples if status == 503)
+    report = {
+        "requests": len(samples),
+        "ok": ok,
+        "rejected": rejected,
+        "errors": len(samples) - ok - rejected,
+        "qps": ok / duration if duration > 0 else 0.0,
+    }
+    for name, q in (("p50_ms", 50), ("p90_ms", 90), ("p99_ms", 99), ("max_ms", 100)):
+        report[name] = float(np.percentile(latencies, q)) if len(latencies) else None
+    return report
+
+
+async def run_load_test(client, duration=10.0, concurrency=8, upload_ratio=0.05,
+                        queries=DEFAULT_QUERIES, pdf_path='test_files/editorial.pdf',
+                        collection="load-test", seed=0):
+    """
+    Sends mixed search and upload traffic to the API for a given time.
+
+    Each of the `concurrency` workers sends one request after the other; a
+    request is an upload with probability `upload_ratio`, otherwise a search.
+    Traffic goes to a dedicated collection, which is seeded with one upload
+    first so that searches have an index to hit.
+
+    Args:
+    client (httpx.AsyncClient): A client pointed at the API.
+    duration (float, optional): Seconds of traffic. Defaults to 10.
+    concurrency (int, optional): Number of concurrent workers. Defaults to 8.
+    upload_ratio (float, optional): Share of uploads. Defaults to 0.05.
+    queries (list, optional): The queries to pick from.
+    pdf_path (str, optional): The PDF file uploaded.
+    collection (str, optional): The collection receiving the traffic.
+    Defaults to "load-test".
+    seed (int, optional): Seed of the traffic mix. Defaults to 0.
+
+    Returns:
+    dict: The summary of the search and upload requests.
+    """
+    with open(pdf_path, 'rb') as file:
+        pdf = file.read()
+    filename = os.path.basename(pdf_path)
+    rng = random.Random(seed)
+    samples = {"search": [], "upload": []}
+
+    async def upload():
+        files = [("files", (filename, pdf, "application/pdf"))]
+        return await client.post(f"/collections/{collection}/upload", files=files)
+
+    async def search():
+        return await client.post(f"/collections/{collection}/search",
+                                 json={"query": rng.choice(queries)})
+
+    response = await upload()
+    response.raise_for_status()
+
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            kind = "upload" if rng.random() < upload_ratio else "search"
+            started = time.perf_counter()
+            try:
+                response = await (upload() if kind == "upload" else search())
+                status = response.status_code
+            except Exception:
+                status = None
+            samples[kind].append((status, time.perf_counter() - started))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {kind: summarize(kind_samples, elapsed) for kind, kind_samples in samples.items()}
+
+
+async def main(args):
+    import httpx
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=None)
+    else:
+        # Drive the app in-process, without a server or the network
+        from src.api import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                   base_url="http://load-test", timeout=None)
+
+    async with client:
+        report = await run_load_test(
+            client,
+            duration=args.duration,
+            concurrency=args.concurrency,
+            upload_ratio=args.upload_ratio,
+            queries=args.query or DEFAULT_QUERIES,
+            pdf_path=args.pdf,
+            collection=args.collection
+        )
+
+    for kind, summary in report.items():
+        print(f"{kind}: " + " ".join(
+            f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in summary.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mixed upload and search load test for the PDF search API.")
+    parser.add_argument("--url", help="Base URL of a running server, e.g. "
+                        "http://localhost:8000. Drives the app in-process when omitted.")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--upload-ratio", type=float, default=0.05)
+    parser.add_argument("--query", action="append", help="Query to send; repeatable.")
+    parser.add_argument("--pdf", default="test_files/editorial.pdf")
+    parser.add_argument("--collection", default="load-test")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,309 @@
+import os
+import pickle
+import zlib
+from collections import deque
+
+import numpy as np
+
+POLICIES = ("skip", "link", "collapse")
+
+MAX_HASH = (1 << 32) - 1
+MERSENNE_PRIME = (1 << 61) - 1
+HASH_BATCH_SIZE = 4096
+
+
+def _permutations(num_perm, seed):
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, MAX_HASH, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, MAX_HASH, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signature(words, num_perm=128, shingle_size=5, seed=1):
+    """
+    Computes the MinHash signature of the word shingles of a document.
+
+    Args:
+    words (iterable): The words of the document, which may be a generator.
+    num_perm (int, optional): Number of hash permutations. Defaults to 128.
+    shingle_size (int, optional): Number of words per shingle. Defaults to 5.
+    seed (int, optional): Seed of the permutations. Signatures are only
+    comparable when computed with the same seed. Defaults to 1.
+
+    Returns:
+    numpy.ndarray: The signature, or None if the document has no words.
+    """
+    a, b = _permutations(num_perm, seed)
+    signature = np.full(num_perm, MAX_HASH, dtype=np.uint64)
+    window = deque(maxlen=shingle_size)
+    batch = []
+    shingles = 0
+
+    def update(batch):
+        hashes = np.array(batch, dtype=np.uint64).reshape(-1, 1)
+        values = ((hashes * a + b) % np.uint64(MERSENNE_PRIME)) & np.uint64(MAX_HASH)
+        np.minimum(signature, values.min(axis=0), out=signature)
+
+    for word in words:
+        window.append(word)
+        if len(window) == shingle_size:
+            batch.append(zlib.crc32(' '.join(window).encode('utf-8')))
+            shingles += 1
+            if len(batch) >= HASH_BATCH_SIZE:
+                update(batch)
+                batch = []
+
+    # Documents shorter than one shingle are a single shingle
+    if shingles == 0:
+        if not window:
+            return None
+        batch.append(zlib.crc32(' '.join(window).encode('utf-8')))
+    if batch:
+        update(batch)
+    return signature
+
+
+def estimate_similarity(signature, other):
+    """
+    Estimates the Jaccard similarity of two documents from their signatures.
+
+    Args:
+    signature (numpy.ndarray): The first signature.
+    other (numpy.ndarray): The second signature.
+
+    Returns:
+    float: The estimated similarity, between 0 and 1.
+    """
+    return float(np.mean(signature == other))
+
+
+def iter_file_words(file_path):
+    """
+    Reads the words of a text file one line at a time.
+
+    Args:
+    file_path (str): The path of the text file.
+
+    Yields:
+    str: Each word of the file.
+    """
+    with open(file_path, 'r') as file:
+        for line in file:
+            yield from line.split()
+
+
+class LSHIndex:
+    """
+    Locality-sensitive hashing index over MinHash signatures. Signatures
+    that share every row of at least one band are candidate duplicates.
+
+    Args:
+    bands (int): Number of bands the signatures are split into.
+    rows (int): Number of signature values per band.
+    """
+
+    def __init__(self, bands, rows):
+        self.bands = bands
+        self.rows = rows
+        self._buckets = {}
+
+    def _keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, name, signature):
+        """
+        Adds a document's signature to the index.
+
+        Args:
+        name (str): The name of the document.
+        signature (numpy.ndarray): Its signature.
+        """
+        for key in self._keys(signature):
+            self._buckets.setdefault(key, set()).add(name)
+
+    def query(self, signature):
+        """
+        Finds the documents sharing a band with a signature.
+
+        Args:
+        signature (numpy.ndarray): The signature to look up.
+
+        Returns:
+        set: The names of the candidate duplicates.
+        """
+        candidates = set()
+        for key in self._keys(signature):
+            candidates |= self._buckets.get(key, set())
+        return candidates
+
+
+def load_signature_store(signatures_path):
+    """
+    Loads the MinHash signatures and known near duplicates saved with an index.
+
+    Args:
+    signatures_path (str): The path of the signature store.
+
+    Returns:
+    dict: The signatures and text file modification times by document, the
+    canonical document of each near duplicate, and the policy applied.
+    """
+    if signatures_path and os.path.exists(signatures_path):
+        with open(signatures_path, 'rb') as file:
+            return pickle.load(file)
+    return {"signatures": {}, "mtimes": {}, "duplicate_of": {}, "policy": "collapse"}
+
+
+def update_near_duplicates(text_directory, signatures_path, policy="collapse", threshold=0.8,
+                           num_perm=128, bands=16):
+    """
+    Computes the signatures of new or changed text files and records which
+    of them are near duplicates of a document seen earlier.
+
+    Args:
+    text_directory (str): Directory where the text files are stored.
+    signatures_path (str): The path of the signature store.
+    policy (str, optional): One of POLICIES, saved with the store. Defaults
+    to "collapse".
+    threshold (float, optional): Estimated Jaccard similarity above which a
+    document is a near duplicate. Defaults to 0.8.
+    num_perm (int, optional): Number of hash permutations. Defaults to 128.
+    bands (int, optional): Number of LSH bands. Defaults to 16.
+
+    Returns:
+    dict: The updated signature store.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown near-duplicate policy: {policy}")
+
+    store = load_signature_store(signatures_path)
+    store["policy"] = policy
+    signatures = store["signatures"]
+    mtimes = store["mtimes"]
+    duplicate_of = store["duplicate_of"]
+
+    # Oldest documents first, so the first version seen stays canonical
+    current = {}
+    for filename in os.listdir(text_directory):
+        if filename.endswith('.txt'):
+            file_path = os.path.join(text_directory, filename)
+            current[filename.replace('.txt', '.pdf')] = (file_path, os.path.getmtime(file_path))
+    current = dict(sorted(current.items(), key=lambda item: (item[1][1], item[0])))
+
+    # Forget documents that were removed or changed since the last ingest
+    for name in list(signatures):
+        if name not in current or mtimes.get(name) != current[name][1]:
+            signatures.pop(name, None)
+            mtimes.pop(name, None)
+            duplicate_of.pop(name, None)
+    for name, canonical in list(duplicate_of.items()):
+        if canonical not in signatures:
+            duplicate_of.pop(name)
+
+    lsh = LSHIndex(bands, num_perm // bands)
+    for name, signature in signatures.items():
+        if signature is not None:
+            lsh.add(name, signature)
+
+    for name, (file_path, mtime) in current.items():
+        if name in signatures:
+            continue
+        signature = minhash_signature(iter_file_words(file_path), num_perm=num_perm)
+        signatures[name] = signature
+        mtimes[name] = mtime
+        if signature is None:
+            continue
+
+        # Confirm the LSH candidates with the estimated similarity
+        best_similarity, best_name = 0.0, None
+        for candidate in lsh.query(signature):
+            similarity = estimate_similarity(signature, signatures[candidate])
+            if similarity > best_similarity:
+                best_similarity, best_name = similarity, candidate
+        if best_name is not None and best_similarity >= threshold:
+            duplicate_of[name] = duplicate_of.get(best_name, best_name)
+        lsh.add(name, signature)
+
+    with open(signatures_path, 'wb') as file:
+        pickle.dump(store, file)
+    return store
+
+
+def excluded_documents(store):
+    """
+    Lists the documents the policy keeps out of the model and index.
+
+    Args:
+    store (dict): The signature store.
+
+    Returns:
+    set: The near duplicates, unless the policy is "link".
+    """
+    if store["policy"] == "link":
+        return set()
+    return set(store["duplicate_of"])
+
+
+def linked_duplicates(store):
+    """
+    Maps the near duplicates left in the index to their canonical document,
+    for collapsing them in search results.
+
+    Args:
+    store (dict): The signature store.
+
+    Returns:
+    dict: The canonical document of each near duplicate, empty unless the
+    policy is "link", since the other policies keep them out of the index.
+    """
+    if store["policy"] != "link":
+        return {}
+    return dict(store["duplicate_of"])
+
+
+def reported_duplicates(store):
+    """
+    Groups the near duplicates under their canonical document, for search
+    results.
+
+    Args:
+    store (dict): The signature store.
+
+    Returns:
+    dict: The near duplicates of each canonical document, empty if the
+    policy is "skip".
+    """
+    duplicates = {}
+    if store["policy"] == "skip":
+        return duplicates
+    for name, canonical in sorted(store["duplicate_of"].items()):
+        duplicates.setdefault(canonical, []).append(name)
+    return duplicates
+
+
+def collapse_hits(hits, duplicate_of, top_n):
+    """
+    Keeps the best-ranked hit of each group of near duplicates, reported
+    under the group's canonical document, so the top slots go to distinct
+    documents.
+
+    Args:
+    hits (list): The (filename, distance) tuples, best match first.
+    duplicate_of (dict): The canonical document of each near duplicate.
+    top_n (int): Number of hits to keep.
+
+    Returns:
+    list: At most top_n (filename, distance) tuples.
+    """
+    collapsed = []
+    seen = set()
+    for filename, distance in hits:
+        canonical = duplicate_of.get(filename, filename)
+        if canonical in seen:
+            continue
+        seen.add(canonical)
+        collapsed.append((canonical, distance))
+        if len(collapsed) == top_n:
+            break
+    return collapsed
@@ -1,5 +1,6 @@
-from pdfminer.high_level import extract_text
+import json
 import os
+import sys
 
 def extract_text_from_pdf(pdf_path):
     """
@@ -14,6 +15,8 @@ def extract_text_from_pdf(pdf_path):
     Exceptions:
     Catches and prints exceptions if text extraction fails, returning None.
     """
+    from pdfminer.high_level import extract_text
+
     try:
         text = extract_text(pdf_path)
         return text
@@ -21,7 +24,204 @@ def extract_text_from_pdf(pdf_path):
         print(f"An error occurred while extracting text: {e}")
         return None
 
-def process_pdf_directory(directory_path, output_directory):
+# LAParams presets, from the fastest to the most faithful layout analysis
+LAPARAMS_PRESETS = {
+    # Skips the advanced layout analysis that orders text boxes
+    "fast": {"boxes_flow": None, "detect_vertical": False, "all_texts": False},
+    # pdfminer defaults, as used by extract_text
+    "default": {},
+    # Also reads vertical text and text inside figures
+    "accurate": {"detect_vertical": True, "all_texts": True},
+}
+
+CHECKPOINT_SUFFIX = '.checkpoint'
+PARTIAL_SUFFIX = '.part'
+PAGES_SUFFIX = '.pages.json'
+
+def make_laparams(preset="default"):
+    """
+    Builds the pdfminer layout parameters of a preset.
+
+    Args:
+    preset (str, optional): One of LAPARAMS_PRESETS. Defaults to "default".
+
+    Returns:
+    LAParams: The layout parameters.
+    """
+    from pdfminer.layout import LAParams
+
+    if preset not in LAPARAMS_PRESETS:
+        raise ValueError(f"Unknown LAParams preset: {preset}")
+    return LAParams(**LAPARAMS_PRESETS[preset])
+
+def iter_pdf_pages(pdf_path, laparams=None, start_page=0):
+    """
+    Extracts the text of a PDF file one page at a time.
+
+    Args:
+    pdf_path (str): The file path of the PDF from which to extract text.
+    laparams (LAParams, optional): The layout parameters. Defaults to the 
+    "default" preset.
+    start_page (int, optional): The first page to extract, counting from 0. 
+    Earlier pages are skipped without layout analysis. Defaults to 0.
+
+    Yields:
+    str: The text of each page, in order.
+    """
+    from pdfminer.high_level import extract_pages
+
+    if laparams is None:
+        laparams = make_laparams()
+    page_numbers = range(start_page, sys.maxsize) if start_page else None
+    for layout in extract_pages(pdf_path, page_numbers=page_numbers, laparams=laparams):
+        yield page_text(layout)
+
+def page_text(layout):
+    """
+    Renders the text of a pdfminer layout object the way extract_text does, 
+    with a newline after each text box.
+
+    Args:
+    layout: An LTPage, or any layout item within it.
+
+    Returns:
+    str: The text of the layout object.
+    """
+    from pdfminer.layout import LTContainer, LTText, LTTextBox
+
+    parts = []
+    if isinstance(layout, LTContainer):
+        for child in layout:
+            parts.append(page_text(child))
+    elif isinstance(layout, LTText):
+        parts.append(layout.get_text())
+    if isinstance(layout, LTTextBox):
+        parts.append('\n')
+    return ''.join(parts)
+
+def extract_pdf_to_text_file(pdf_path, output_file_path, laparams=None, checkpoint_every=10):
+    """
+    Extracts the text of a PDF file page by page, writing each lowercased 
+    page to the output file as soon as it is extracted.
+
+    Progress is checkpointed every `checkpoint_every` pages, so that an 
+    interrupted extraction resumes from the last checkpoint instead of the 
+    first page. The checkpoint records the PDF's size and modification 
+    time, and is discarded if the PDF was replaced since. Pages are 
+    separated by form feeds, like pdfminer's extract_text, and the 
+    character offset of each page is saved next to the text file in a 
+    .pages.json file.
+
+    Args:
+    pdf_path (str): The file path of the PDF from which to extract text.
+    output_file_path (str): The path of the .txt file to write.
+    laparams (LAParams, optional): The layout parameters. Defaults to the 
+    "default" preset.
+    checkpoint_every (int, optional): Pages between checkpoints. Defaults to 10.
+
+    Returns:
+    int: The number of characters written, or None if extraction fails.
+
+    Exceptions:
+    Catches and prints exceptions if text extraction fails, returning None. 
+    The checkpoint is kept so the next attempt can resume.
+    """
+    partial_path = output_file_path + PARTIAL_SUFFIX
+    checkpoint_path = output_file_path + CHECKPOINT_SUFFIX
+
+    # Resume from the last checkpoint, if any, unless the PDF has changed
+    source = {"mtime": os.path.getmtime(pdf_path), "size": os.path.getsize(pdf_path)}
+    state = read_checkpoint(checkpoint_path, source) if os.path.exists(partial_path) else None
+    if state is None:
+        state = {"pages": 0, "chars": 0, "bytes": 0, "offsets": [], "source": source}
+
+    try:
+        with open(partial_path, 'ab') as output:
+            # Drop anything written after the last checkpoint
+            output.truncate(state["bytes"])
+
+            for text in iter_pdf_pages(pdf_path, laparams, start_page=state["pages"]):
+                text = text.lower() + '\f'
+                data = text.encode('utf-8')
+                output.write(data)
+                state["offsets"].append(state["chars"])
+                state["pages"] += 1
+                state["chars"] += len(text)
+                state["bytes"] += len(data)
+
+                if state["pages"] % checkpoint_every == 0:
+                    output.flush()
+                    os.fsync(output.fileno())
+                    write_checkpoint(checkpoint_path, state)
+    except Exception as e:
+        print(f"An error occurred while extracting text: {e}")
+        return None
+
+    os.replace(partial_path, output_file_path)
+    with open(os.path.splitext(output_file_path)[0] + PAGES_SUFFIX, 'w') as file:
+        json.dump(state["offsets"], file)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return state["chars"]
+
+def read_checkpoint(checkpoint_path, source):
+    """
+    Reads an extraction checkpoint, discarding it if it cannot be used.
+
+    Args:
+    checkpoint_path (str): The path of the checkpoint.
+    source (dict): The size and modification time of the PDF being extracted.
+
+    Returns:
+    dict: The extraction state, or None if there is no checkpoint, it is 
+    unreadable, or it was saved for another version of the PDF.
+    """
+    if not os.path.exists(checkpoint_path):
+        return None
+    try:
+        with open(checkpoint_path, 'r') as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        state = None
+    if not isinstance(state, dict) or state.get("source") != source:
+        # Start over rather than trust the partial text
+        os.remove(checkpoint_path)
+        return None
+    return state
+
+def write_checkpoint(checkpoint_path, state):
+    """
+    Saves an extraction checkpoint atomically, so that an interruption 
+    leaves either the previous checkpoint or the new one.
+
+    Args:
+    checkpoint_path (str): The path of the checkpoint.
+    state (dict): The extraction state.
+    """
+    temporary_path = checkpoint_path + '.tmp'
+    with open(temporary_path, 'w') as file:
+        json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, checkpoint_path)
+
+def is_extracted(pdf_path, output_file_path):
+    """
+    Checks whether a PDF file's text has already been fully extracted since 
+    the PDF was last written.
+
+    Args:
+    pdf_path (str): The file path of the PDF.
+    output_file_path (str): The path of its .txt file.
+
+    Returns:
+    bool: True if the text file is complete and up to date.
+    """
+    return (os.path.exists(output_file_path)
+            and not os.path.exists(output_file_path + CHECKPOINT_SUFFIX)
+            and os.path.getmtime(output_file_path) >= os.path.getmtime(pdf_path))
+
+def process_pdf_directory(directory_path, output_directory, laparams_preset="default"):
     """
     Processes all PDF files in a given directory, extracting text and 
     saving it as .txt files.
@@ -30,30 +230,35 @@ def process_pdf_directory(directory_path, output_directory):
     directory_path (str): The path to the directory containing PDF files.
     output_directory (str): The path to the directory where extracted 
     text files should be saved.
+    laparams_preset (str, optional): One of LAPARAMS_PRESETS. Defaults to 
+    "default".
 
     Returns:
     list: A list of the original filenames of the processed PDFs.
 
     Description:
-    For each PDF file in the directory, this function extracts text, converts 
-    it to lowercase,
-    and saves it as a .txt file in the output directory. It keeps track of the 
-    filenames of the processed PDFs.
+    For each PDF file in the directory, this function extracts text page by 
+    page, converts it to lowercase, and saves it as a .txt file in the output 
+    directory. PDFs whose text is already up to date are not extracted again, 
+    and interrupted extractions resume from their last checkpoint. It keeps 
+    track of the filenames of the processed PDFs.
     """
     if not os.path.exists(output_directory):
         os.makedirs(output_directory)
 
+    laparams = make_laparams(laparams_preset)
     original_filenames = []
 
     for filename in os.listdir(directory_path):
         if filename.endswith('.pdf'):
             file_path = os.path.join(directory_path, filename)
-            text = extract_text_from_pdf(file_path)
-            if text:
-                text = text.lower()
-                output_file_path = os.path.join(output_directory, os.path.splitext(filename)[0] + '.txt')
-                with open(output_file_path, 'w') as file:
-                    file.write(text)
+            output_file_path = os.path.join(output_directory, os.path.splitext(filename)[0] + '.txt')
+            if is_extracted(file_path, output_file_path):
+                original_filenames.append(filename)
+                continue
+
+            chars = extract_pdf_to_text_file(file_path, output_file_path, laparams)
+            if chars:
                 original_filenames.append(filename)
 
     return original_filenames
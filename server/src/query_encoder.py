@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+STRATEGIES = ("full", "reduced", "average", "auto")
+
+
+class QueryEncoder:
+    """
+    Turns a query into a vector for the FAISS index, trading inference
+    accuracy for latency according to the chosen strategy.
+
+    Strategies:
+    full: model.infer_vector with the model's own epoch count.
+    reduced: model.infer_vector with `epochs` inference epochs.
+    average: mean of the query's word vectors, falling back to reduced
+    inference when none of the words are in the vocabulary.
+    auto: average for queries of at most `max_average_words` words,
+    reduced otherwise.
+
+    The cheaper strategies can rank documents differently from full
+    inference: measure their top-n overlap on the real index with
+    compare_strategies (`python -m src.query_encoder <queries>`) before
+    switching away from "full".
+
+    Args:
+    strategy (str, optional): One of STRATEGIES. Defaults to "full".
+    epochs (int, optional): Inference epochs for the reduced strategy. Defaults to 10.
+    max_average_words (int, optional): Longest query that auto encodes by
+    averaging word vectors. Defaults to 3.
+    cache_size (int, optional): Number of encoded queries to memoize.
+    0 disables the memo. Defaults to 1024.
+    """
+
+    def __init__(self, strategy="full", epochs=10, max_average_words=3, cache_size=1024):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown query encoding strategy: {strategy}")
+        self.strategy = strategy
+        self.epochs = epochs
+        self.max_average_words = max_average_words
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def encode(self, words, model):
+        """
+        Encodes a tokenized query, reusing a memoized vector when possible.
+
+        Args:
+        words (list): The query words.
+        model: The Doc2Vec model.
+
+        Returns:
+        numpy.ndarray: The unit-length query vector as a (1, dimension) 
+        float32 array, like the document vectors in the index.
+        """
+        key = tuple(words)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            generation = self._generation
+
+        vector = np.array(self._encode(words, model), dtype='float32').reshape(1, -1)
+        norm = np.linalg.norm(vector)
+        if norm != 0:
+            vector = vector / norm
+
+        if self.cache_size > 0:
+            with self._lock:
+                # The model was replaced while encoding: the vector is stale
+                if generation != self._generation:
+                    return vector
+                self._cache[key] = vector
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return vector
+
+    def clear(self):
+        """
+        Forgets every memoized query vector, e.g. after the model changed.
+        Vectors still being encoded with the previous model are not memoized.
+        """
+        with self._lock:
+            self._cache.clear()
+            self._generation += 1
+
+    def _encode(self, words, model):
+        strategy = self.strategy
+        if strategy == "auto":
+            strategy = "average" if len(words) <= self.max_average_words else "reduced"
+
+        if strategy == "average":
+            vector = average_word_vectors(words, model)
+            if vector is not None:
+                return vector
+            strategy = "reduced"
+
+        if strategy == "reduced":
+            return model.infer_vector(words, epochs=self.epochs)
+        return model.infer_vector(words)
+
+
+def average_word_vectors(words, model):
+    """
+    Averages the word vectors of the query words known to the model.
+
+    Args:
+    words (list): The query words.
+    model: The Doc2Vec model.
+
+    Returns:
+    numpy.ndarray: The mean word vector, or None if no word is in the vocabulary.
+    """
+    known = [word for word in words if word in model.wv.key_to_index]
+    if not known:
+        return None
+    return np.mean([model.wv[word] for word in known], axis=0)
+
+
+def compare_strategies(queries, model, faiss_index, strategies=STRATEGIES,
+                       top_n=5, **encoder_options):
+    """
+    Measures, for each strategy, how many of the top-n documents found with
+    full inference it still finds, and how long it takes to encode a query.
+
+    Args:
+    queries (list): The queries to evaluate.
+    model: The Doc2Vec model.
+    faiss_index: The FAISS index.
+    strategies (tuple, optional): The strategies to evaluate. Defaults to STRATEGIES.
+    top_n (int, optional): Number of top results to compare. Defaults to 5.
+    **encoder_options: Extra QueryEncoder arguments (epochs, max_average_words).
+
+    Returns:
+    dict: For each strategy, the mean top-n overlap with full inference
+    (between 0 and 1) and the mean encoding time in milliseconds.
+    """
+    tokenized = [query.lower().split() for query in queries]
+    reference_encoder = QueryEncoder("full", cache_size=0)
+    reference = []
+    for words in tokenized:
+        _, indices = faiss_index.search(reference_encoder.encode(words, model), top_n)
+        reference.append({idx for idx in indices[0] if idx != -1})
+
+    report = {}
+    for strategy in strategies:
+        encoder = QueryEncoder(strategy, cache_size=0, **encoder_options)
+        overlaps = []
+        elapsed = 0.0
+        for words, expected in zip(tokenized, reference):
+            started = time.perf_counter()
+            query_vector = encoder.encode(words, model)
+            elapsed += time.perf_counter() - started
+            _, indices = faiss_index.search(query_vector, top_n)
+            found = {idx for idx in indices[0] if idx != -1}
+            overlaps.append(len(found & expected) / len(expected) if expected else 1.0)
+        report[strategy] = {
+            "overlap": float(np.mean(overlaps)) if overlaps else 1.0,
+            "mean_encode_ms": 1000 * elapsed / max(len(tokenized), 1),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    import config
+    from src.search import load_model_index_and_filenames
+
+    model, faiss_index, _ = load_model_index_and_filenames(
+        config.MODEL_PATH, config.FAISS_INDEX_PATH, config.FILENAMES_PATH)
+    queries = sys.argv[1:] or [config.WARMUP_QUERY]
+    for strategy, result in compare_strategies(queries, model, faiss_index).items():
+        print(f"{strategy}: overlap={result['overlap']:.2f} "
+              f"encode={result['mean_encode_ms']:.2f}ms")
@@ -1,9 +1,14 @@
 import pickle
-import faiss
+import re
 import numpy as np
 import os
+from functools import lru_cache
 
-def load_model_index_and_filenames(model_path, faiss_index_path, filenames_path):
+from src.near_duplicates import collapse_hits
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def load_model_index_and_filenames(model_path, faiss_index_path, filenames_path, mmap=False):
     """
     Loads the model, FAISS index, and filenames from specified paths.
 
@@ -11,161 +16,261 @@ def load_model_index_and_filenames(model_path, faiss_index_path, filenames_path)
     model_path (str): Path to the saved model.
     faiss_index_path (str): Path to the saved FAISS index.
     filenames_path (str): Path to the saved filenames.
+    mmap (bool, optional): Memory-map the FAISS index instead of reading it 
+    into memory. Defaults to False.
 
     Returns:
     tuple: A tuple containing the loaded model, FAISS index, and list of filenames.
     """
+    import faiss
+
     model = pickle.load(open(model_path, "rb"))
-    faiss_index = faiss.read_index(faiss_index_path)
+    io_flags = faiss.IO_FLAG_MMAP if mmap else 0
+    faiss_index = faiss.read_index(faiss_index_path, io_flags)
     filenames = pickle.load(open(filenames_path, "rb"))
     return model, faiss_index, filenames
 
-def count_occurrences(query, text, exact_search):
+def rank(query, model, faiss_index, filenames, top_n=5, encoder=None, duplicate_of=None):
     """
-    Counts the occurrences of a query in a given text.
+    Finds the documents closest to a query in the FAISS index.
 
     Args:
     query (str): The search query.
-    text (str): The text in which to search for the query.
-    exact_search (bool): Flag to indicate whether to perform exact or approximate search.
+    model: The Doc2Vec model.
+    faiss_index: The FAISS index.
+    filenames (list): List of filenames corresponding to the documents in the index.
+    top_n (int, optional): Number of top results to return. Defaults to 5.
+    encoder (QueryEncoder, optional): Encodes the query. Defaults to full 
+    inference with model.infer_vector.
+    duplicate_of (dict, optional): The canonical document of each near 
+    duplicate in the index. Near duplicates are collapsed into one hit.
 
     Returns:
-    int: The count of occurrences of the query in the text.
+    list: A list of (filename, distance) tuples, best match first.
     """
-    text = text.lower()
-    count = 0
-
-    # Count occurrences based on exact or approximate search
-    if exact_search:
-        count = text.count(query.lower())
+    # Vectorize the query and search in the FAISS index
+    if encoder is not None:
+        query_vector = encoder.encode(query.lower().split(), model)
     else:
-        for word in query.lower().split():
-            count += text.count(word)
+        query_vector = model.infer_vector(query.lower().split())
+        query_vector = np.array(query_vector).reshape(1, -1).astype('float32')
+    # Fetch enough neighbours to fill top_n even if every duplicate ranks first
+    k = top_n + len(duplicate_of) if duplicate_of else top_n
+    distances, indices = faiss_index.search(query_vector, min(k, max(faiss_index.ntotal, top_n)))
 
-    return count
+    hits = [(filenames[idx], distance)
+            for idx, distance in zip(indices[0], distances[0]) if idx != -1]
+    if duplicate_of:
+        hits = collapse_hits(hits, duplicate_of, top_n)
+    return hits
 
-def search(query, model, faiss_index, filenames, text_directory, top_n=5):
+def parse_query(query):
     """
-    Performs a search on the indexed data using a query.
+    Splits a query into the terms to look for in the text.
 
     Args:
-    query (str): The search query.
-    model: The Doc2Vec model.
-    faiss_index: The FAISS index.
-    filenames (list): List of filenames corresponding to the documents in the index.
-    text_directory (str): Directory where the text files are stored.
-    top_n (int, optional): Number of top results to return. Defaults to 5.
+    query (str): The search query. Queries wrapped in double quotes are exact.
 
     Returns:
-    list: A list of search results with filename, distance, snippet, and occurrences.
+    list: The lowercased query itself for exact queries, otherwise its 
+    distinct words.
     """
-    # Vectorize the query and search in the FAISS index
-    query_vector = model.infer_vector(query.lower().split())
-    query_vector = np.array(query_vector).reshape(1, -1).astype('float32')
-    distances, indices = faiss_index.search(query_vector, top_n)
-
     # Determine if the search is exact
-    exact_search = query.startswith('"') and query.endswith('"')
-    query = query[1:-1].lower() if exact_search else query.lower()
+    if len(query) > 1 and query.startswith('"') and query.endswith('"'):
+        exact_query = query[1:-1].lower()
+        return [exact_query] if exact_query else []
+    return list(dict.fromkeys(query.lower().split()))
 
-    # Compile search results
-    results = []
-    for idx, distance in zip(indices[0], distances[0]):
-        if idx != -1:
-            original_filename = filenames[idx]
-            text_filename = os.path.splitext(original_filename)[0] + '.txt'
-            with open(f"{text_directory}/{text_filename}", "r") as file:
-                text = file.read().lower()
-                snippet = find_snippet(query, text) if exact_search else find_approximate_snippet(query, text)
-                occurrences = count_occurrences(query, text, exact_search)
-            results.append((original_filename, distance, snippet, occurrences))
-    return results
+@lru_cache(maxsize=256)
+def compile_matcher(terms):
+    """
+    Compiles one regular expression matching every term, so that a single 
+    pass over a text finds all of them.
 
-def clean_text(text):
+    Args:
+    terms (tuple): The terms to match.
+
+    Returns:
+    re.Pattern: The compiled pattern, or None if there are no terms.
     """
-    Cleans the given text by removing new lines and excessive spaces.
+    if not terms:
+        return None
+    # Longest terms first, so that a term wins over its prefixes
+    alternatives = sorted(terms, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(term) for term in alternatives))
+
+@lru_cache(maxsize=256)
+def overlapping_terms(terms):
+    """
+    Finds the terms whose occurrences can overlap another term's, such as 
+    "model" inside "models". The matcher only reports one of two 
+    overlapping occurrences, so these terms cannot be counted from its 
+    matches.
 
     Args:
-    text (str): The text to clean.
+    terms (tuple): The terms to match.
 
     Returns:
-    str: The cleaned text.
+    set: The terms that contain, are contained in, or end with the start of 
+    another term.
     """
-    # Replace newlines and carriage returns, then remove extra spaces
-    text = text.replace('\n', ' ').replace('\r', ' ')
-    text = ' '.join(text.split())
-    return text
+    overlapping = set()
+    for term in terms:
+        for other in terms:
+            if term == other:
+                continue
+            if term in other or any(other.startswith(term[i:]) for i in range(1, len(term))):
+                overlapping.update((term, other))
+    return overlapping
 
-def find_approximate_snippet(query, text, context_size=255):
+def count_terms(terms, text, matches):
     """
-    Finds an approximate snippet from text based on a query.
+    Counts the occurrences of each term in a text from the matcher's matches.
 
     Args:
-    query (str): The search query.
+    terms (list): The terms to count.
+    text (str): The text the matches were found in.
+    matches (list): The (start, end) offsets returned by find_matches.
+
+    Returns:
+    dict: The number of occurrences of each term.
+    """
+    term_counts = dict.fromkeys(terms, 0)
+    for start, end in matches:
+        term_counts[text[start:end]] += 1
+    # Count terms hidden by an overlapping match on their own
+    for term in overlapping_terms(tuple(terms)):
+        term_counts[term] = text.count(term)
+    return term_counts
+
+def find_matches(terms, text):
+    """
+    Finds every occurrence of the terms in a text in one pass.
+
+    Args:
+    terms (list): The terms to match.
     text (str): The text to search within.
-    context_size (int, optional): The size of context around the query. Defaults to 255.
 
     Returns:
-    str: A snippet of text around the query.
+    list: The (start, end) offsets of each match, in order.
     """
-    # Identify the closest occurrence of any word in the query
-    words = query.split()
-    closest_start = len(text)
-    closest_end = 0
+    matcher = compile_matcher(tuple(terms))
+    if matcher is None:
+        return []
+    return [match.span() for match in matcher.finditer(text)]
 
-    for word in words:
-        start_index = text.find(word)
-        if start_index != -1:
-            closest_start = min(closest_start, start_index)
-            end_index = start_index + len(word)
-            closest_end = max(closest_end, end_index)
+def densest_window(matches, window_size):
+    """
+    Finds the run of consecutive matches, starting within window_size 
+    characters of each other, that holds the most matches.
 
-    # Extract snippet if found
-    if closest_start < len(text) and closest_end > 0:
-        start_snippet = max(0, closest_start - context_size)
-        end_snippet = min(closest_end + context_size, len(text))
+    Args:
+    matches (list): The (start, end) offsets of the matches, in order.
+    window_size (int): The maximum distance between the first and last 
+    match start.
 
-        start_sentence = text.rfind('. ', 0, start_snippet) + 2
-        if start_sentence < 0:
-            start_sentence = 0
-        end_sentence = text.find('. ', end_snippet)
-        if end_sentence < 0:
-            end_sentence = len(text)
-        else:
-            end_sentence += 2
+    Returns:
+    tuple: The start of the first and end of the last match of the densest 
+    run, or None if there are no matches.
+    """
+    if not matches:
+        return None
+    best_first, best_last = 0, 0
+    first = 0
+    for last in range(len(matches)):
+        while matches[last][0] - matches[first][0] > window_size:
+            first += 1
+        if last - first > best_last - best_first:
+            best_first, best_last = first, last
+    return matches[best_first][0], matches[best_last][1]
 
-        return clean_text(text[start_sentence:end_sentence])
+def build_snippet(query, original_filename, text_directory, context_size=255):
+    """
+    Reads the extracted text of a document and, from one pass of the query 
+    matcher over it, finds the densest snippet, the occurrences of each query 
+    term and where to highlight them in the snippet.
 
-    return "Snippet not found."
+    Args:
+    query (str): The search query. Queries wrapped in double quotes are exact.
+    original_filename (str): The filename of the PDF document.
+    text_directory (str): Directory where the text files are stored.
+    context_size (int, optional): The size of context around the matches. 
+    Defaults to 255.
 
-def find_snippet(query, text, context_size=255):
+    Returns:
+    tuple: The snippet, the total number of occurrences, the number of 
+    occurrences of each term, and the [start, end] highlight spans in the 
+    snippet.
     """
-    Finds an exact snippet from text based on a query.
+    terms = parse_query(query)
+
+    # Extracted texts are stored lowercased
+    text_filename = os.path.splitext(original_filename)[0] + '.txt'
+    with open(f"{text_directory}/{text_filename}", "r") as file:
+        text = file.read()
+    matches = find_matches(terms, text)
+
+    term_counts = count_terms(terms, text, matches)
+    occurrences = sum(term_counts.values())
+
+    window = densest_window(matches, 2 * context_size)
+    if window is None:
+        return "Snippet not found.", occurrences, term_counts, []
+
+    # Widen the window with context, then to whole sentences
+    start_snippet = max(0, window[0] - context_size)
+    end_snippet = min(window[1] + context_size, len(text))
+
+    start_sentence = text.rfind('. ', 0, start_snippet)
+    start_sentence = start_sentence + 2 if start_sentence >= 0 else 0
+    end_sentence = text.find('. ', end_snippet)
+    end_sentence = end_sentence + 2 if end_sentence >= 0 else len(text)
+
+    snippet = clean_text(text[start_sentence:end_sentence])
+    highlights = [[start, end] for start, end in find_matches(terms, snippet)]
+    return snippet, occurrences, term_counts, highlights
+
+def search(query, model, faiss_index, filenames, text_directory, top_n=5, encoder=None,
+           duplicate_of=None):
+    """
+    Performs a search on the indexed data using a query.
 
     Args:
     query (str): The search query.
-    text (str): The text to search within.
-    context_size (int, optional): The size of context around the query. Defaults to 255.
+    model: The Doc2Vec model.
+    faiss_index: The FAISS index.
+    filenames (list): List of filenames corresponding to the documents in the index.
+    text_directory (str): Directory where the text files are stored.
+    top_n (int, optional): Number of top results to return. Defaults to 5.
+    encoder (QueryEncoder, optional): Encodes the query. Defaults to full 
+    inference with model.infer_vector.
+    duplicate_of (dict, optional): The canonical document of each near 
+    duplicate in the index. Near duplicates are collapsed into one result.
 
     Returns:
-    str: A snippet of text around the query.
-    """
-    # Locate the exact query in the text
-    query_length = len(query)
-    start_index = text.find(query)
-    if start_index != -1:
-        start_snippet = max(0, start_index - context_size)
-        end_snippet = min(start_index + query_length + context_size, len(text))
-
-        start_sentence = text.rfind('. ', 0, start_snippet) + 2
-        if start_sentence < 0:
-            start_sentence = 0
-
-        end_sentence = text.find('. ', end_snippet)
-        if end_sentence < 0:
-            end_sentence = len(text)
-        else:
-            end_sentence += 2
-
-        return clean_text(text[start_sentence:end_sentence])
-    return "Snippet not found."
\ No newline at end of file
+    list: A list of search results with filename, distance, snippet, 
+    occurrences, occurrences of each term, and highlight spans.
+    """
+    # Compile search results
+    results = []
+    for original_filename, distance in rank(query, model, faiss_index, filenames,
+                                            top_n=top_n, encoder=encoder,
+                                            duplicate_of=duplicate_of):
+        snippet, occurrences, term_counts, highlights = build_snippet(
+            query, original_filename, text_directory)
+        results.append((original_filename, distance, snippet, occurrences,
+                        term_counts, highlights))
+    return results
+
+def clean_text(text):
+    """
+    Cleans the given text by removing new lines and excessive spaces.
+
+    Args:
+    text (str): The text to clean.
+
+    Returns:
+    str: The cleaned text.
+    """
+    # Collapse newlines, carriage returns and runs of spaces in one pass
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
@@ -1,16 +1,14 @@
 import os
-import gensim
 import numpy as np
-import faiss
-from sklearn.decomposition import PCA
 
 
-def load_documents(directory_path):
+def load_documents(directory_path, exclude=None):
     """
     Loads documents from a specified directory and stores their contents in a dictionary.
 
     Args:
     directory_path (str): The path to the directory containing text files.
+    exclude (set, optional): Original filenames of documents to leave out.
 
     Returns:
     dict: A dictionary where keys are the original filenames (converted from .txt to .pdf) and 
@@ -24,6 +22,8 @@ def load_documents(directory_path):
     for filename in os.listdir(directory_path):
         if filename.endswith('.txt'):
             original_filename = filename.replace('.txt', '.pdf')
+            if exclude and original_filename in exclude:
+                continue
             with open(os.path.join(directory_path, filename), 'r') as file:
                 documents[original_filename] = file.read().lower()
     return documents
@@ -42,6 +42,7 @@ def vectorize_documents(documents, vector_size=300, window=10, min_count=2, epoc
     Returns:
     tuple: A trained Doc2Vec model and a list of document vectors.
     """
+    import gensim
 
     tagged_data = [gensim.models.doc2vec.TaggedDocument(words=_d.split(), tags=[str(i)]) for i, _d in enumerate(documents.values())]
     model = gensim.models.Doc2Vec(tagged_data, vector_size=vector_size, window=window, min_count=min_count, epochs=epochs)
@@ -52,10 +53,6 @@ def vectorize_documents(documents, vector_size=300, window=10, min_count=2, epoc
     # Normalize each vector to have unit length
     doc_vectors = [vec / np.linalg.norm(vec) if np.linalg.norm(vec) != 0 else np.zeros_like(vec) for vec in doc_vectors]
 
-    # Réduction de dimension avec PCA
-    # pca = PCA(n_components=n_components)
-    # doc_vectors = pca.fit_transform(doc_vectors)
-
     return model, doc_vectors
 
 def create_faiss_index(doc_vectors):
@@ -70,6 +67,8 @@ def create_faiss_index(doc_vectors):
     faiss.IndexFlatIP: A FAISS index object for the document vectors 
     based on cosine similarity.
     """
+    import faiss
+
     dimension = len(doc_vectors[0])
     # Using IndexFlatIP for cosine similarity
     index = faiss.IndexFlatIP(dimension)
@@ -0,0 +1,97 @@
+# tests/test_admission.py
+
+import asyncio
+import threading
+from src.admission import AdmissionController, QueueFull
+from src.load_test import summarize
+import pytest
+
+def make_controller(workers=2, max_queue=1, max_running=1):
+    return AdmissionController(workers, {
+        "search": {"priority": 0, "max_running": max_running, "max_queue": max_queue},
+        "ingest": {"priority": 1, "max_running": max_running, "max_queue": max_queue},
+    }, retry_after=2)
+
+def test_every_queue_keeps_a_worker():
+    with pytest.raises(ValueError):
+        make_controller(workers=2, max_running=2)
+
+@pytest.mark.asyncio
+async def test_run_offloads_to_worker_thread():
+    controller = make_controller()
+    thread = await controller.run("search", lambda: threading.current_thread().name)
+    controller.close()
+    assert thread.startswith("admission"), "Expected the work to run on the pool"
+    assert controller.stats()["search"] == {"running": 0, "waiting": 0}
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected():
+    controller = make_controller(max_queue=1)
+    release = threading.Event()
+
+    running = asyncio.ensure_future(controller.run("search", release.wait))
+    queued = asyncio.ensure_future(controller.run("search", lambda: None))
+    await asyncio.sleep(0.05)
+    assert controller.stats()["search"] == {"running": 1, "waiting": 1}
+
+    with pytest.raises(QueueFull) as excinfo:
+        await controller.run("search", lambda: None)
+    assert excinfo.value.retry_after == 2
+
+    release.set()
+    await asyncio.gather(running, queued)
+    controller.close()
+
+@pytest.mark.asyncio
+async def test_search_is_admitted_before_ingest():
+    controller = make_controller(workers=3, max_queue=2, max_running=2)
+    release_first, release = threading.Event(), threading.Event()
+    order = []
+
+    # Every worker is busy
+    first = asyncio.ensure_future(controller.run("search", release_first.wait))
+    running = [asyncio.ensure_future(controller.run("search", release.wait)),
+               asyncio.ensure_future(controller.run("ingest", release.wait))]
+    await asyncio.sleep(0.05)
+    # Ingest queues first, but search has the better priority
+    ingest = asyncio.ensure_future(controller.run("ingest", order.append, "ingest"))
+    await asyncio.sleep(0)
+    search = asyncio.ensure_future(controller.run("search", order.append, "search"))
+    await asyncio.sleep(0.05)
+
+    # Both waiting requests could take the freed worker
+    release_first.set()
+    await asyncio.gather(first, search, ingest)
+    release.set()
+    await asyncio.gather(*running)
+    controller.close()
+    assert order == ["search", "ingest"]
+
+@pytest.mark.asyncio
+async def test_ingest_runs_under_search_backlog():
+    controller = make_controller(workers=2, max_queue=8)
+    release = threading.Event()
+
+    searches = [asyncio.ensure_future(controller.run("search", release.wait))
+                for _ in range(4)]
+    await asyncio.sleep(0.05)
+    ingest = asyncio.ensure_future(controller.run("ingest", lambda: "ingested"))
+
+    # The ingest gets the worker held back while searches are still waiting
+    assert await asyncio.wait_for(ingest, 1) == "ingested"
+    assert controller.stats()["search"] == {"running": 1, "waiting": 3}
+
+    release.set()
+    await asyncio.gather(*searches)
+    controller.close()
+
+def test_summarize():
+    samples = [(200, 0.010), (200, 0.020), (503, 0.001), (500, 0.030), (None, 0.5)]
+    report = summarize(samples, duration=2.0)
+    assert report["requests"] == 5
+    assert report["ok"] == 2
+    assert report["rejected"] == 1
+    assert report["errors"] == 2
+    assert report["qps"] == 1.0
+    assert report["max_ms"] == 500.0
+    assert summarize([], 1.0)["p50_ms"] is None
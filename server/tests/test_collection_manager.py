@@ -0,0 +1,146 @@
+# tests/test_collection_manager.py
+
+import gc
+import os
+import shutil
+import threading
+import weakref
+import config
+from src.collection_manager import CollectionManager, collection_paths, index_size
+from src.engine import SearchEngine
+import pytest
+import pickle
+import faiss
+import numpy as np
+
+# Create a mock vector and index for testing purposes
+mock_vector = np.random.rand(100).astype('float32')
+mock_index = faiss.IndexFlatL2(100)
+mock_index.add(np.array([mock_vector]))
+
+# Create a mock model that returns the mock vector for any input
+class MockModel:
+    def infer_vector(self, words):
+        return mock_vector
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_and_teardown():
+    # Setup before tests run
+    setup_directories()
+    # This will run after the tests have completed
+    yield
+    # Teardown after tests run
+    teardown_directories()
+
+def setup_directories():
+    # Create two collections with the same mock index
+    for name in ("first", "second"):
+        paths = collection_paths(config.TEST_COLLECTIONS_PATH, name)
+        for key in ("index_path", "text_path", "files_path"):
+            os.makedirs(paths[key], exist_ok=True)
+        shutil.copy('test_files/editorial.txt', paths["text_path"])
+        pickle.dump(MockModel(), open(paths["model_path"], 'wb'))
+        faiss.write_index(mock_index, paths["faiss_index_path"])
+        pickle.dump(['editorial.pdf'], open(paths["filenames_path"], 'wb'))
+
+def teardown_directories():
+    shutil.rmtree(config.TEST_NODE_PATH, ignore_errors=True)
+
+def make_engine(paths):
+    return SearchEngine(
+        paths["model_path"],
+        paths["faiss_index_path"],
+        paths["filenames_path"],
+        paths["text_path"]
+    )
+
+def make_manager(memory_budget_bytes):
+    return CollectionManager(config.TEST_COLLECTIONS_PATH, make_engine, memory_budget_bytes)
+
+def test_collection_paths():
+    paths = collection_paths(config.TEST_COLLECTIONS_PATH, "team-a")
+    assert paths["text_path"] == os.path.join(config.TEST_COLLECTIONS_PATH, "team-a", "extracted_texts")
+    with pytest.raises(ValueError):
+        collection_paths(config.TEST_COLLECTIONS_PATH, "../escape")
+
+def test_names_and_exists():
+    manager = make_manager(0)
+    assert manager.names() == ["first", "second"]
+    assert manager.exists("first")
+    assert not manager.exists("third")
+
+def test_get_loads_collection_lazily():
+    manager = make_manager(10 * 1024 * 1024)
+    assert manager.resident() == {}
+    engine = manager.get("first")
+    assert isinstance(engine.model, MockModel), "Expected the index to be loaded on first use"
+    assert manager.get("first") is engine, "Expected the resident engine to be reused"
+    results = engine.search("test query")
+    assert results[0][0] == 'editorial.pdf'
+
+def test_least_recently_used_collection_is_evicted():
+    first_size = index_size(make_engine(collection_paths(config.TEST_COLLECTIONS_PATH, "first")))
+    manager = make_manager(first_size)
+
+    first = manager.get("first")
+    manager.get("second")
+    assert list(manager.resident()) == ["second"], "Expected the idle collection to be evicted"
+
+    # A request still holding the evicted engine finishes on its index
+    # without loading it again, and the index is released with it
+    loads = []
+    first.load = lambda: loads.append("first")
+    assert first.search("test query")[0][0] == 'editorial.pdf'
+    assert loads == [], "Expected no reload outside the manager"
+    released = weakref.ref(first)
+    del first
+    gc.collect()
+    assert released() is None, "Expected the evicted index to be released"
+
+    engine = manager.get("first")
+    assert isinstance(engine.model, MockModel), "Expected the evicted collection to load again"
+    assert list(manager.resident()) == ["first"]
+    manager.close()
+    assert manager.resident() == {}
+
+def test_collection_without_index_is_not_registered():
+    manager = make_manager(10 * 1024 * 1024)
+    os.makedirs(collection_paths(config.TEST_COLLECTIONS_PATH, "empty")["files_path"])
+    assert manager.exists("empty")
+    assert manager.get("empty") is None, "Expected no engine without an index"
+    assert manager.resident() == {}
+    shutil.rmtree(collection_paths(config.TEST_COLLECTIONS_PATH, "empty")["node_path"])
+
+def test_index_loads_outside_the_manager_lock():
+    loading = threading.Event()
+    release = threading.Event()
+    loads = []
+
+    class SlowEngine(SearchEngine):
+        def load(self):
+            loads.append(self.model_path)
+            loading.set()
+            release.wait(5)
+            return super().load()
+
+    def make_slow_engine(paths):
+        return SlowEngine(paths["model_path"], paths["faiss_index_path"],
+                          paths["filenames_path"], paths["text_path"])
+
+    manager = CollectionManager(config.TEST_COLLECTIONS_PATH, make_slow_engine,
+                                10 * 1024 * 1024)
+    engines = []
+    threads = [threading.Thread(target=lambda: engines.append(manager.get("first")))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    assert loading.wait(5)
+
+    # The manager stays responsive while the index loads
+    assert manager.resident() == {}
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1, "Expected concurrent requests to share one load"
+    assert engines[0] is engines[1]
+    manager.close()
@@ -0,0 +1,129 @@
+# tests/test_engine.py
+
+import os
+import shutil
+import config
+from src.engine import SearchEngine
+import pytest
+import pickle
+import faiss
+import numpy as np
+
+# Create a mock vector and index for testing purposes
+mock_vector = np.random.rand(100).astype('float32')
+mock_index = faiss.IndexFlatL2(100)
+mock_index.add(np.array([mock_vector]))
+
+# Create a mock model that returns the mock vector for any input
+class MockModel:
+    def infer_vector(self, words):
+        return mock_vector
+
+# A model that breaks the warm-up query
+class BrokenModel:
+    def infer_vector(self, words):
+        raise RuntimeError("corrupt model")
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_and_teardown():
+    # Setup before tests run
+    setup_directories()
+    # This will run after the tests have completed
+    yield
+    # Teardown after tests run
+    teardown_directories()
+
+def setup_directories():
+    os.makedirs(config.TEST_TEXT_PATH, exist_ok=True)
+    os.makedirs(config.TEST_INDEX_PATH, exist_ok=True)
+    shutil.copy('test_files/editorial.txt', config.TEST_TEXT_PATH)
+
+    # Save a mock model, index and filenames to the test index path
+    pickle.dump(MockModel(), open(config.TEST_MODEL_PATH, 'wb'))
+    faiss.write_index(mock_index, config.TEST_FAISS_INDEX_PATH)
+    pickle.dump(['editorial.pdf'], open(config.TEST_FILENAMES_PATH, 'wb'))
+
+def teardown_directories():
+    shutil.rmtree(config.TEST_NODE_PATH, ignore_errors=True)
+
+def make_engine(model_path=config.TEST_MODEL_PATH):
+    return SearchEngine(
+        model_path,
+        config.TEST_FAISS_INDEX_PATH,
+        config.TEST_FILENAMES_PATH,
+        config.TEST_TEXT_PATH,
+        mmap=True
+    )
+
+def test_start_loads_and_warms_up_index():
+    engine = make_engine()
+    assert not engine.ready, "Engine should not be ready before startup"
+
+    metrics = engine.start()
+    assert engine.ready, "Engine should be ready after startup"
+    assert isinstance(engine.model, MockModel), "Expected the model to stay loaded"
+    assert engine.faiss_index.ntotal == 1
+    assert metrics["warmup_seconds"] is not None, "Expected the warm-up to be timed"
+
+def test_start_without_index_is_ready():
+    engine = make_engine(model_path=os.path.join(config.TEST_INDEX_PATH, 'missing.pkl'))
+    metrics = engine.start()
+    assert engine.ready, "An empty node should be ready straight away"
+    assert engine.model is None
+    assert metrics["warmup_seconds"] is None
+
+def test_failed_warm_up_is_ready_but_degraded():
+    broken_model_path = os.path.join(config.TEST_INDEX_PATH, 'broken.pkl')
+    pickle.dump(BrokenModel(), open(broken_model_path, 'wb'))
+    engine = make_engine(model_path=broken_model_path)
+
+    metrics = engine.start()
+    assert engine.ready, "A failed warm-up should not keep the engine unready"
+    assert engine.degraded
+    assert "corrupt model" in metrics["startup_error"]
+
+    # A reload after an ingest repairs the engine
+    engine.model_path = config.TEST_MODEL_PATH
+    engine.load()
+    assert engine.ready
+    assert not engine.degraded
+
+def test_search_records_first_query():
+    engine = make_engine()
+    engine.start()
+    results = engine.search("test query")
+    assert len(results) > 0, "Expected at least one result from search"
+    assert results[0][0] == 'editorial.pdf'
+    assert engine.metrics["first_query_seconds"] is not None
+
+def test_clear_reloads_on_next_search():
+    engine = make_engine()
+    engine.start()
+    engine.clear()
+    assert engine.model is None
+    engine.search("test query")
+    assert isinstance(engine.model, MockModel), "Expected the index to be reloaded"
+
+@pytest.mark.asyncio
+async def test_stream_sends_hits_before_snippets():
+    engine = make_engine()
+    engine.start()
+    hits = engine.rank("test query")
+    events = [event async for event in engine.stream("test query", hits)]
+    engine.close()
+
+    types = [event["type"] for event in events]
+    assert types == ["hit", "snippet", "done"], "Expected hits, then snippets, then done"
+    assert events[0]["document"] == 'editorial.pdf'
+    assert events[1]["rank"] == 0
+    assert "occurrences" in events[1] and "snippet" in events[1]
+    assert engine.metrics["time_to_first_result_seconds"] is not None
+
+@pytest.mark.asyncio
+async def test_stream_reports_snippet_errors():
+    engine = make_engine()
+    engine.start()
+    events = [event async for event in engine.stream("test query", [('missing.pdf', 0.5)])]
+    engine.close()
+    assert events[1]["type"] == "error"
+    assert events[1]["document"] == 'missing.pdf'
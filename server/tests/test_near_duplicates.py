@@ -0,0 +1,90 @@
+# tests/test_near_duplicates.py
+
+import os
+import shutil
+import config
+from src.near_duplicates import (minhash_signature, estimate_similarity, update_near_duplicates,
+                                 load_signature_store, excluded_documents, reported_duplicates,
+                                 linked_duplicates, collapse_hits)
+import pytest
+
+with open('test_files/editorial.txt', 'r') as f:
+    EDITORIAL = f.read().lower()
+
+@pytest.fixture(autouse=True)
+def setup_and_teardown():
+    # Setup before each test
+    setup_directories()
+    yield
+    # Teardown after each test
+    teardown_directories()
+
+def setup_directories():
+    os.makedirs(config.TEST_TEXT_PATH, exist_ok=True)
+    os.makedirs(config.TEST_INDEX_PATH, exist_ok=True)
+    words = EDITORIAL.split()
+    texts = {
+        'editorial.txt': EDITORIAL,
+        # A re-export with a different cover page
+        'editorial-v2.txt': 'cover page for the 1998 reprint\n' + EDITORIAL,
+        # An unrelated document
+        'other.txt': ' '.join(reversed(words)),
+    }
+    for age, (filename, text) in enumerate(texts.items()):
+        file_path = os.path.join(config.TEST_TEXT_PATH, filename)
+        with open(file_path, 'w') as f:
+            f.write(text)
+        # Files written in order, oldest first
+        os.utime(file_path, (1000000 + age, 1000000 + age))
+
+def teardown_directories():
+    shutil.rmtree(config.TEST_NODE_PATH, ignore_errors=True)
+
+def test_minhash_signature():
+    signature = minhash_signature(EDITORIAL.split())
+    assert signature.shape == (128,)
+    assert estimate_similarity(signature, minhash_signature(EDITORIAL.split())) == 1.0
+    assert minhash_signature([]) is None
+    assert minhash_signature(["short"]) is not None, "Short documents should still get a signature"
+
+def test_similar_documents_have_similar_signatures():
+    signature = minhash_signature(EDITORIAL.split())
+    near = minhash_signature(('cover page ' + EDITORIAL).split())
+    other = minhash_signature(list(reversed(EDITORIAL.split())))
+    assert estimate_similarity(signature, near) > 0.9
+    assert estimate_similarity(signature, other) < 0.2
+
+def test_update_near_duplicates_collapse():
+    store = update_near_duplicates(config.TEST_TEXT_PATH, config.TEST_SIGNATURES_PATH)
+    assert store["duplicate_of"] == {'editorial-v2.pdf': 'editorial.pdf'}
+    assert excluded_documents(store) == {'editorial-v2.pdf'}
+    assert reported_duplicates(store) == {'editorial.pdf': ['editorial-v2.pdf']}
+    assert linked_duplicates(store) == {}, "Excluded duplicates need no collapsing"
+
+    # The store persists alongside the index
+    assert load_signature_store(config.TEST_SIGNATURES_PATH)["duplicate_of"] == store["duplicate_of"]
+
+def test_update_near_duplicates_policies():
+    store = update_near_duplicates(config.TEST_TEXT_PATH, config.TEST_SIGNATURES_PATH, policy="link")
+    assert excluded_documents(store) == set(), "Linked duplicates stay in the index"
+    assert reported_duplicates(store) == {'editorial.pdf': ['editorial-v2.pdf']}
+    assert linked_duplicates(store) == {'editorial-v2.pdf': 'editorial.pdf'}
+
+    store = update_near_duplicates(config.TEST_TEXT_PATH, config.TEST_SIGNATURES_PATH, policy="skip")
+    assert excluded_documents(store) == {'editorial-v2.pdf'}
+    assert reported_duplicates(store) == {}
+
+    with pytest.raises(ValueError):
+        update_near_duplicates(config.TEST_TEXT_PATH, config.TEST_SIGNATURES_PATH, policy="merge")
+
+def test_removed_canonical_is_forgotten():
+    update_near_duplicates(config.TEST_TEXT_PATH, config.TEST_SIGNATURES_PATH)
+    os.remove(os.path.join(config.TEST_TEXT_PATH, 'editorial.txt'))
+    store = update_near_duplicates(config.TEST_TEXT_PATH, config.TEST_SIGNATURES_PATH)
+    assert 'editorial.pdf' not in store["signatures"]
+    assert store["duplicate_of"] == {}
+
+def test_collapse_hits():
+    hits = [('a-v2.pdf', 0.9), ('a.pdf', 0.8), ('b.pdf', 0.7), ('c.pdf', 0.6)]
+    collapsed = collapse_hits(hits, {'a-v2.pdf': 'a.pdf'}, top_n=2)
+    assert collapsed == [('a.pdf', 0.9), ('b.pdf', 0.7)]
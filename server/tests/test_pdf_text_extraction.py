@@ -1,7 +1,10 @@
 # tests/test_pdf_text_extraction.py
 import os
+import json
 import shutil
-from src.pdf_text_extraction_script import extract_text_from_pdf, process_pdf_directory
+import pytest
+import src.pdf_text_extraction_script as extraction
+from src.pdf_text_extraction_script import extract_text_from_pdf, process_pdf_directory, extract_pdf_to_text_file, make_laparams
 
 # Assurez-vous d'avoir un dossier test_files avec des fichiers PDF pour les tests
 TEST_FILES_DIRECTORY = 'test_files'
@@ -33,4 +36,116 @@ def test_process_pdf_directory():
             assert len(text) > 0
 
     # Cleanup the output directory after the test
-    shutil.rmtree(TEST_OUTPUT_DIRECTORY)
\ No newline at end of file
+    shutil.rmtree(TEST_OUTPUT_DIRECTORY)
+
+def test_make_laparams():
+    assert make_laparams("fast").boxes_flow is None
+    with pytest.raises(ValueError):
+        make_laparams("slowest")
+
+def test_extract_pdf_to_text_file():
+    os.makedirs(TEST_OUTPUT_DIRECTORY, exist_ok=True)
+    test_pdf_path = os.path.join(TEST_FILES_DIRECTORY, 'editorial.pdf')
+    output_file_path = os.path.join(TEST_OUTPUT_DIRECTORY, 'editorial.txt')
+
+    chars = extract_pdf_to_text_file(test_pdf_path, output_file_path)
+    with open(output_file_path, 'r') as f:
+        text = f.read()
+    with open(os.path.join(TEST_OUTPUT_DIRECTORY, 'editorial.pages.json'), 'r') as f:
+        offsets = json.load(f)
+
+    # Same text as a whole-document extraction, with every page start recorded
+    assert text == extract_text_from_pdf(test_pdf_path).lower()
+    assert chars == len(text)
+    assert offsets[0] == 0
+    assert all(text[offset - 1] == '\f' for offset in offsets[1:])
+    assert not os.path.exists(output_file_path + extraction.CHECKPOINT_SUFFIX)
+
+    shutil.rmtree(TEST_OUTPUT_DIRECTORY)
+
+def test_extract_pdf_to_text_file_resumes(monkeypatch):
+    os.makedirs(TEST_OUTPUT_DIRECTORY, exist_ok=True)
+    test_pdf_path = os.path.join(TEST_FILES_DIRECTORY, 'editorial.pdf')
+    output_file_path = os.path.join(TEST_OUTPUT_DIRECTORY, 'editorial.txt')
+    iter_pdf_pages = extraction.iter_pdf_pages
+
+    # Interrupt the extraction after the second page
+    def interrupted(pdf_path, laparams=None, start_page=0):
+        for page, text in enumerate(iter_pdf_pages(pdf_path, laparams, start_page)):
+            if page == 2:
+                raise RuntimeError("interrupted")
+            yield text
+
+    monkeypatch.setattr(extraction, 'iter_pdf_pages', interrupted)
+    assert extract_pdf_to_text_file(test_pdf_path, output_file_path, checkpoint_every=1) is None
+    assert not os.path.exists(output_file_path)
+    with open(output_file_path + extraction.CHECKPOINT_SUFFIX, 'r') as f:
+        assert json.load(f)["pages"] == 2
+
+    # Resume from the third page
+    started_at = []
+    def resumed(pdf_path, laparams=None, start_page=0):
+        started_at.append(start_page)
+        return iter_pdf_pages(pdf_path, laparams, start_page)
+
+    monkeypatch.setattr(extraction, 'iter_pdf_pages', resumed)
+    extract_pdf_to_text_file(test_pdf_path, output_file_path, checkpoint_every=1)
+    assert started_at == [2]
+    with open(output_file_path, 'r') as f:
+        assert f.read() == extract_text_from_pdf(test_pdf_path).lower()
+    assert not os.path.exists(output_file_path + extraction.CHECKPOINT_SUFFIX)
+
+    shutil.rmtree(TEST_OUTPUT_DIRECTORY)
+
+def test_extract_pdf_to_text_file_restarts_for_replaced_pdf(monkeypatch):
+    os.makedirs(TEST_OUTPUT_DIRECTORY, exist_ok=True)
+    test_pdf_path = os.path.join(TEST_OUTPUT_DIRECTORY, 'editorial.pdf')
+    shutil.copy(os.path.join(TEST_FILES_DIRECTORY, 'editorial.pdf'), test_pdf_path)
+    output_file_path = os.path.join(TEST_OUTPUT_DIRECTORY, 'editorial.txt')
+    iter_pdf_pages = extraction.iter_pdf_pages
+
+    # Interrupt the extraction after the second page
+    def interrupted(pdf_path, laparams=None, start_page=0):
+        for page, text in enumerate(iter_pdf_pages(pdf_path, laparams, start_page)):
+            if page == 2:
+                raise RuntimeError("interrupted")
+            yield text
+
+    monkeypatch.setattr(extraction, 'iter_pdf_pages', interrupted)
+    assert extract_pdf_to_text_file(test_pdf_path, output_file_path, checkpoint_every=1) is None
+
+    # A new upload replaces the PDF before the next attempt
+    stat = os.stat(test_pdf_path)
+    os.utime(test_pdf_path, (stat.st_atime, stat.st_mtime + 60))
+
+    started_at = []
+    def restarted(pdf_path, laparams=None, start_page=0):
+        started_at.append(start_page)
+        return iter_pdf_pages(pdf_path, laparams, start_page)
+
+    monkeypatch.setattr(extraction, 'iter_pdf_pages', restarted)
+    extract_pdf_to_text_file(test_pdf_path, output_file_path, checkpoint_every=1)
+    assert started_at == [0], "Expected the stale checkpoint to be discarded"
+    with open(output_file_path, 'r') as f:
+        assert f.read() == extract_text_from_pdf(test_pdf_path).lower()
+    assert not os.path.exists(output_file_path + extraction.CHECKPOINT_SUFFIX)
+
+    shutil.rmtree(TEST_OUTPUT_DIRECTORY)
+
+def test_extract_pdf_to_text_file_ignores_truncated_checkpoint():
+    os.makedirs(TEST_OUTPUT_DIRECTORY, exist_ok=True)
+    test_pdf_path = os.path.join(TEST_FILES_DIRECTORY, 'editorial.pdf')
+    output_file_path = os.path.join(TEST_OUTPUT_DIRECTORY, 'editorial.txt')
+
+    # An interruption while the checkpoint was being written
+    with open(output_file_path + extraction.PARTIAL_SUFFIX, 'w') as f:
+        f.write('partial text')
+    with open(output_file_path + extraction.CHECKPOINT_SUFFIX, 'w') as f:
+        f.write('{"pages": 2, "cha')
+
+    extract_pdf_to_text_file(test_pdf_path, output_file_path)
+    with open(output_file_path, 'r') as f:
+        assert f.read() == extract_text_from_pdf(test_pdf_path).lower()
+    assert not os.path.exists(output_file_path + extraction.CHECKPOINT_SUFFIX)
+
+    shutil.rmtree(TEST_OUTPUT_DIRECTORY)
@@ -0,0 +1,71 @@
+# tests/test_query_encoder.py
+
+import numpy as np
+import pytest
+from src.query_encoder import QueryEncoder, STRATEGIES, average_word_vectors, compare_strategies
+from src.vectorization_faiss_index_script import vectorize_documents, create_faiss_index
+
+
+@pytest.fixture(scope="module")
+def model_and_index():
+    # Train a small model on the editorial split into a few documents
+    with open('test_files/editorial.txt', 'r') as file:
+        words = file.read().lower().split()
+    chunk = max(len(words) // 4, 1)
+    documents = {f"part{i}.pdf": ' '.join(words[i * chunk:(i + 1) * chunk]) for i in range(4)}
+    model, doc_vectors = vectorize_documents(documents, vector_size=20, epochs=5)
+    return model, create_faiss_index(doc_vectors)
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        QueryEncoder("fastest")
+
+def test_encode_shape(model_and_index):
+    model, _ = model_and_index
+    for strategy in STRATEGIES:
+        vector = QueryEncoder(strategy).encode(["the", "editorial"], model)
+        assert vector.shape == (1, 20), f"Unexpected shape for {strategy}"
+        assert vector.dtype == np.float32
+        assert np.linalg.norm(vector) == pytest.approx(1.0, abs=1e-5), \
+            f"Expected a unit vector for {strategy}"
+
+def test_average_falls_back_to_inference(model_and_index):
+    model, _ = model_and_index
+    assert average_word_vectors(["zzzunknownzzz"], model) is None
+    vector = QueryEncoder("average").encode(["zzzunknownzzz"], model)
+    assert vector.shape == (1, 20), "Expected reduced inference for unknown words"
+
+def test_memo_is_bounded(model_and_index):
+    model, _ = model_and_index
+    encoder = QueryEncoder("reduced", cache_size=2)
+    first = encoder.encode(["the"], model)
+    assert encoder.encode(["the"], model) is first, "Expected the memoized vector"
+
+    encoder.encode(["a"], model)
+    encoder.encode(["of"], model)
+    assert len(encoder._cache) == 2
+    assert ("the",) not in encoder._cache, "Expected the least recent query to be evicted"
+
+    encoder.clear()
+    assert len(encoder._cache) == 0
+
+def test_stale_vector_is_not_memoized():
+    encoder = QueryEncoder("full")
+
+    # A model replaced while the query is being encoded
+    class ReloadingModel:
+        def infer_vector(self, words):
+            encoder.clear()
+            return np.ones(20)
+
+    vector = encoder.encode(["the"], ReloadingModel())
+    assert vector.shape == (1, 20)
+    assert ("the",) not in encoder._cache, "Expected the stale vector to be dropped"
+
+def test_compare_strategies(model_and_index):
+    model, index = model_and_index
+    report = compare_strategies(["the editorial", "a"], model, index, top_n=2, epochs=2)
+    assert set(report) == set(STRATEGIES)
+    for result in report.values():
+        assert 0.0 <= result["overlap"] <= 1.0
+        assert result["mean_encode_ms"] >= 0
@@ -3,7 +3,8 @@
 import os
 import shutil
 import config
-from src.search import load_model_index_and_filenames, search
+from src.search import (load_model_index_and_filenames, search, parse_query, find_matches, densest_window,
+                        count_terms, build_snippet)
 import pytest
 import pickle
 import faiss
@@ -74,4 +75,53 @@ def test_search():
     # We expect the mock model to find the query vector identical to the mock vector, so distance should be 0
     assert results[0][1] == 0, "Expected distance to be 0 for the mock search"
 
+def test_parse_query():
+    assert parse_query('Machine learning machine') == ['machine', 'learning']
+    assert parse_query('"Machine Learning"') == ['machine learning']
+    assert parse_query('""') == []
+
+def test_find_matches():
+    text = "learning about machine learning"
+    # One pass finds every term, preferring the longest at each position
+    assert find_matches(['learn', 'learning', 'machine'], text) == [(0, 8), (15, 22), (23, 31)]
+    assert find_matches([], text) == []
+
+def test_count_terms_with_nested_terms():
+    text = "models of a model, and an anchor"
+    terms = ['model', 'models', 'an', 'anchor', 'ancho']
+    counts = count_terms(terms, text, find_matches(terms, text))
+    # Terms inside other terms are counted like str.count
+    assert counts == {term: text.count(term) for term in terms}
+    assert counts['model'] == 2
+
+    terms = ['machine', 'learning']
+    text = "machine learning"
+    assert count_terms(terms, text, find_matches(terms, text)) == {'machine': 1, 'learning': 1}
+
+def test_densest_window():
+    matches = [(0, 1), (100, 101), (110, 111), (120, 121)]
+    assert densest_window(matches, 50) == (100, 121)
+    assert densest_window([], 50) is None
+
+def test_build_snippet():
+    snippet, occurrences, term_counts, highlights = build_snippet(
+        'machine learning', 'editorial.pdf', config.TEST_TEXT_PATH)
+    assert occurrences == sum(term_counts.values())
+    assert term_counts['machine'] > 0 and term_counts['learning'] > 0
+    assert '\n' not in snippet
+    assert highlights, "Expected highlight spans in the snippet"
+    for start, end in highlights:
+        assert snippet[start:end] in term_counts
+
+    with open(os.path.join(config.TEST_TEXT_PATH, 'editorial.txt'), 'r') as f:
+        text = f.read()
+    _, occurrences, term_counts, _ = build_snippet(
+        'model models', 'editorial.pdf', config.TEST_TEXT_PATH)
+    assert term_counts == {'model': text.count('model'), 'models': text.count('models')}
+
+    snippet, occurrences, term_counts, highlights = build_snippet(
+        '"no such phrase anywhere"', 'editorial.pdf', config.TEST_TEXT_PATH)
+    assert snippet == "Snippet not found."
+    assert occurrences == 0 and highlights == []
+
 # Run tests with pytest from the command line